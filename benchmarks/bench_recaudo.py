@@ -0,0 +1,154 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from recaudo import MOTOR_EXCEL, Medicion, ejecutar_cruce, ejecutar_cruce_por_bloques
+
+from .datos_sinteticos import ARCHIVOS, escribir_juego
+
+# Benchmark del cruce de recaudo sobre juegos sintéticos. Uso, desde la raíz del repositorio:
+#   python -m benchmarks.bench_recaudo --tamanos 10000 100000 1000000 -o resultados.json
+# Los juegos generados se guardan en --datos y se reutilizan entre corridas (generar 1M de filas
+# tarda más que cruzarlas). Cada corrida va en un proceso nuevo, creado con spawn para que el pico
+# de memoria del proceso (ru_maxrss) sea el de esa corrida: con fork, el hijo arranca con las
+# páginas del padre (p. ej. el juego recién generado) y las cuenta en su pico.
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+
+# Fase del benchmark de cada etapa de la Medicion del cruce (en el cruce por bloques, la lectura,
+# el cruce y la escritura de Siigo y del Acumulado son etapas internas de su etapa "por bloques")
+FASES = {
+    "leer lote (liquidación, órdenes, provisión)": "carga",
+    "diferencias efecty / siigo": "conciliacion",
+    "exportar xlsx": "exportacion",
+    "escribir efecty": "exportacion",
+    "escribir siigo (bloques)": "exportacion",
+    "escribir acumulado (bloques)": "exportacion",
+    "cerrar xlsx": "exportacion",
+}
+
+
+def _fase(etapa):
+    if etapa.startswith("leer "):
+        return "carga"
+    return FASES.get(etapa, "cruce")
+
+
+def _segundos_propios(etapas):
+    # Tiempo de cada etapa sin el de sus etapas internas, para que sumar por fase no cuente dos veces
+    propios = etapas["SEGUNDOS"].copy()
+    abiertas = []
+    for i, nivel in enumerate(etapas["NIVEL"]):
+        del abiertas[nivel:]
+        if abiertas:
+            propios.iloc[abiertas[-1]] -= etapas["SEGUNDOS"].iloc[i]
+        abiertas.append(i)
+    return propios.clip(lower=0)
+
+
+def _memoria_proceso_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return round(pico / 2**20 if platform.system() == "Darwin" else pico / 2**10, 1)
+
+
+def correr(rutas, motor=None, memoria=False, filas_bloque=None):
+    # Un cruce completo (carga, cruce, conciliación y Excel de salida) medido por etapa;
+    # con filas_bloque, el cruce por bloques (Siigo y Acumulado fuera de memoria)
+    medicion = Medicion(memoria=memoria)
+    with tempfile.TemporaryDirectory() as temporal:
+        salida = Path(temporal) / "datos_cruzados.xlsx"
+        inicio = time.perf_counter()
+        if filas_bloque is None:
+            resultado = ejecutar_cruce(*rutas, salida, motor=motor, medicion=medicion)
+            filas_siigo = len(resultado.df_siigo)
+        else:
+            resultado = ejecutar_cruce_por_bloques(*rutas, salida, motor=motor, filas_bloque=filas_bloque,
+                                                   medicion=medicion)
+            filas_siigo = resultado.filas_siigo
+        segundos = time.perf_counter() - inicio
+
+    etapas = medicion.tabla()
+    etapas["FASE"] = etapas["ETAPA"].map(_fase)
+    etapas["PROPIOS"] = _segundos_propios(etapas)
+    fases = etapas.groupby("FASE", sort=False).agg(SEGUNDOS=("PROPIOS", "sum"),
+                                                   MEMORIA_PICO_MB=("MEMORIA PICO MB", "max"))
+    return {
+        "filas_liquidacion": len(resultado.df_total),
+        "filas_siigo": filas_siigo,
+        "segundos": round(segundos, 3),
+        "memoria_proceso_mb": _memoria_proceso_mb(),
+        "fases": {fase: {"segundos": round(fila.SEGUNDOS, 3),
+                         "memoria_pico_mb": None if pd.isna(fila.MEMORIA_PICO_MB) else fila.MEMORIA_PICO_MB}
+                  for fase, fila in fases.iterrows()},
+        "etapas": medicion.a_dict()["etapas"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del cruce de recaudo con datos sintéticos.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS,
+                        help="Órdenes de la Liquidación de cada juego (por defecto 10k, 100k y 1M)")
+    parser.add_argument("--datos", default="benchmarks/datos", help="Carpeta de los juegos generados")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Corridas por tamaño")
+    parser.add_argument("--motor", choices=["calamine", "openpyxl"], default=None,
+                        help="Motor de lectura de Excel (por defecto calamine si está instalado)")
+    parser.add_argument("--memoria-por-etapa", action="store_true",
+                        help="Pico de memoria por etapa con tracemalloc (varias veces más lento; los tiempos "
+                             "no son comparables con corridas sin esta opción)")
+    parser.add_argument("--por-bloques", type=int, metavar="FILAS", default=None,
+                        help="Mide el cruce por bloques (Siigo y Acumulado fuera de memoria) con este tamaño de bloque")
+    parser.add_argument("-o", "--salida", default=None, help="JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for n in args.tamanos:
+        carpeta = Path(args.datos) / f"{n}"
+        rutas = [carpeta / nombre for nombre in ARCHIVOS]
+        if not all(ruta.exists() for ruta in rutas):
+            inicio = time.perf_counter()
+            rutas = escribir_juego(n, carpeta)
+            print(f"{n}: juego generado en {time.perf_counter() - inicio:.1f} s  ->  {carpeta}")
+
+        for repeticion in range(1, args.repeticiones + 1):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                corrida = pool.submit(correr, rutas, args.motor, args.memoria_por_etapa, args.por_bloques).result()
+            corrida.update({"tamano": n, "repeticion": repeticion})
+            resultados.append(corrida)
+            fases = "  ".join(f"{fase} {datos['segundos']:.2f} s" for fase, datos in corrida["fases"].items())
+            print(f"{n} [{repeticion}]: {corrida['segundos']:.2f} s ({fases})  "
+                  f"RSS pico {corrida['memoria_proceso_mb']} MB")
+
+    resumen = {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "motor": args.motor or MOTOR_EXCEL,
+        "nucleos": os.cpu_count(),
+        "tracemalloc": args.memoria_por_etapa,
+        "filas_bloque": args.por_bloques,
+        "corridas": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resumen, archivo, ensure_ascii=False, indent=2)
+        print(f"Resultados  ->  {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
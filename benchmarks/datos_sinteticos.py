@@ -0,0 +1,140 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from recaudo.exportar import escribir_libro
+
+# Juego sintético de archivos del cruce con la forma de los reales: encabezados como los exporta
+# cada sistema (mayúsculas/tildes mezcladas), órdenes con varios clientes repetidos, Siigo con
+# descripciones "FV-1-12345 1020304050" (algunas con espacio tras el guion, como en Siigo) más
+# movimientos que no son facturas, y un Acumulado del año anterior con órdenes que no se cruzan.
+
+NOMBRES = ["JOSÉ", "MARÍA", "ÁNGELA", "LUIS", "ANDRÉS", "SOFÍA", "CAMILO", "NATALIA", "JESÚS", "VALENTINA"]
+APELLIDOS = ["NÚÑEZ", "PEÑA", "GÓMEZ", "RODRÍGUEZ", "MUÑOZ", "LÓPEZ", "GARCÍA", "MARTÍNEZ", "HERNÁNDEZ", "DÍAZ"]
+PROYECTOS = ["MUNICIPIO A", "MUNICIPIO B", "MUNICIPIO C", "MUNICIPIO D"]
+MESES = ["ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO", "JULIO", "AGOSTO", "SEPTIEMBRE",
+         "OCTUBRE", "NOVIEMBRE", "DICIEMBRE"]
+
+# Archivos del juego, en el orden de ARCHIVOS_RECAUDO
+ARCHIVOS = ["Liquidacion.xlsx", "Ordenes.xlsx", "Provision.xlsx", "Siigo.xlsx", "Acumulado.xlsx"]
+
+
+def _fechas(rng, n, anio):
+    segundos = rng.integers(0, 365 * 24 * 3600, size=n)
+    return pd.Timestamp(f"{anio}-01-01") + pd.to_timedelta(segundos, unit="s")
+
+
+def generar_juego(n, semilla=0, clientes_por_orden=3, pagados=0.95, ruido_siigo=0.02):
+    # Devuelve (liquidación, órdenes, provisión, siigo, acumulado) para n órdenes de recaudo
+    rng = np.random.default_rng(semilla)
+    n_clientes = max(n // clientes_por_orden, 1)
+
+    nui = 500_000 + np.arange(n_clientes)
+    cedula = 1_000_000_000 + rng.permutation(n_clientes) * 7
+    proyecto = rng.choice(PROYECTOS, size=n_clientes)
+
+    orden = 10_000_000 + np.arange(n)
+    cliente = rng.integers(0, n_clientes, size=n)
+    factura = 100_000 + np.arange(n)
+    valor = rng.integers(10, 500, size=n) * 1000.0
+
+    liquidacion = pd.DataFrame({
+        "Documento": orden,
+        "Código Proyecto": rng.integers(1, 5, size=n),
+        "Fecha": _fechas(rng, n, 2025),
+        "Forma de pago": "EFECTIVO",
+        "Código punto de servicio": rng.integers(1000, 9999, size=n),
+        "Valor movilizado": valor,
+        "Valor comisión": 2500.0,
+        "IVA": 475.0,
+        "Total liquidación": 2975.0,
+        "ANO": 2025,
+    })
+
+    # Órdenes en otro orden que la liquidación, como llegan del sistema de facturación
+    mezcla = rng.permutation(n)
+    ordenes = pd.DataFrame({
+        "NUMERO_ORDEN": orden[mezcla],
+        "IDENTIFICACION": nui[cliente][mezcla],
+        "NOMBRES": rng.choice(NOMBRES, size=n),
+        "APELLIDO1": rng.choice(APELLIDOS, size=n),
+        "APELLIDO2": rng.choice(APELLIDOS, size=n),
+        "FACTURA": "FE" + pd.Series(factura[mezcla]).astype(str),
+    })
+
+    provision = pd.DataFrame({"NUI": nui, "CC": cedula, "PROYECTO": proyecto})
+
+    # Siigo: una fila por factura pagada (a veces con otro valor) más movimientos que no son facturas
+    pagadas = np.flatnonzero(rng.random(n) < pagados)
+    debito = valor[pagadas] + np.where(rng.random(len(pagadas)) < 0.05, 1000.0, 0.0)
+    separador = np.where(rng.random(len(pagadas)) < 0.1, "- ", "-")
+    descripcion = ("FV" + pd.Series(separador) + "1-" + pd.Series(factura[pagadas]).astype(str) + " "
+                   + pd.Series(cedula[cliente[pagadas]]).astype(str))
+    n_ruido = int(len(pagadas) * ruido_siigo)
+    descripcion = pd.concat([descripcion, "AJUSTE SALDO " + pd.Series(np.arange(n_ruido)).astype(str)],
+                            ignore_index=True)
+    filas_siigo = len(descripcion)
+    siigo = pd.DataFrame({
+        "Código contable": 13050501,
+        "Cuenta contable": "CLIENTES NACIONALES",
+        "Comprobante": "RC-1-" + pd.Series(rng.integers(1, 9999, size=filas_siigo)).astype(str),
+        "Secuencia": np.arange(1, filas_siigo + 1),
+        "Fecha elaboración": _fechas(rng, filas_siigo, 2025),
+        "Nombre del tercero": rng.choice(APELLIDOS, size=filas_siigo),
+        "Descripción": descripcion,
+        "Centro de costo": rng.integers(1, 20, size=filas_siigo),
+        "Débito": np.concatenate([debito, rng.integers(1, 100, size=n_ruido) * 1000.0]),
+    })
+
+    # Acumulado: órdenes del año anterior (no se repiten con las del lote)
+    fecha_acumulado = _fechas(rng, n, 2024)
+    cliente_acumulado = rng.integers(0, n_clientes, size=n)
+    valor_acumulado = rng.integers(10, 500, size=n) * 1000.0
+    acumulado = pd.DataFrame({
+        "MEDIO DE PAGO": "EFECTIVO",
+        "MEDIO DE RECAUDO": "EFECTY",
+        "FECHA": fecha_acumulado,
+        "MES": np.array(MESES)[fecha_acumulado.month - 1],
+        "AÑO": 2024,
+        "CÓDIGO PUNTO DE SERVICIO": rng.integers(1000, 9999, size=n),
+        "ORDEN DE SERVICIO": 1_000_000 + np.arange(n),
+        "VALOR MOVILIZADO": valor_acumulado,
+        "VALOR COMISIÓN": 2500.0,
+        "IVA": 475.0,
+        "TOTAL LIQUIDACIÓN": 2975.0,
+        "NUI": nui[cliente_acumulado],
+        "CEDULA": cedula[cliente_acumulado],
+        "NOMBRE": rng.choice(NOMBRES, size=n),
+        "FACTURA": "FE" + pd.Series(np.arange(n)).astype(str),
+        "MUNICIPIO": proyecto[cliente_acumulado],
+        "VALIDADO": "SI",
+        "COMPROBANTE CONTABLE": "RC-1-" + pd.Series(rng.integers(1, 9999, size=n)).astype(str),
+    })
+
+    return liquidacion, ordenes, provision, siigo, acumulado
+
+
+def escribir_juego(n, carpeta, semilla=0):
+    # Escribe el juego de n órdenes en carpeta (Excel con constant_memory) y devuelve las rutas
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    rutas = [carpeta / nombre for nombre in ARCHIVOS]
+    for ruta, df in zip(rutas, generar_juego(n, semilla)):
+        escribir_libro([("Hoja1", [(df, 0, 0)], None)], destino=ruta)
+    return rutas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un juego sintético de archivos de recaudo.")
+    parser.add_argument("filas", type=int, help="Órdenes de la Liquidación")
+    parser.add_argument("carpeta", help="Carpeta de salida")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+    for ruta in escribir_juego(args.filas, args.carpeta, args.semilla):
+        print(ruta)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,124 @@
 import streamlit as st
-import pandas as pd
 from io import BytesIO
-import locale
-import platform
 import os
-import unidecode  # type: ignore
-
-# Configuración inicial de la app
-st.set_page_config(page_title="Recaudo y Cartera", page_icon="📊", layout="wide")
-
-# Título principal
-st.title("📊 Captura de Datos")
-
-# Menú de selección
-opcion = st.sidebar.selectbox("Selecciona una opción:", ["Inicio", "Recaudo", "Cartera"])
-
-# ------------------- FUNCIOfrom io import BytesIO
-import pandas as pd
-
-def generar_xlsx(df1, df2, df3, df4, df5, df6, df7):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        workbook = writer.book
-        formato_pesos = workbook.add_format({'num_format': '$#,##0', 'align': 'right'})
-
-        # --- Hoja: Datos_Cruzados Efecty ---
-        df1.to_excel(writer, sheet_name='Datos_Cruzados Efecty', index=False)
-        hoja1 = writer.sheets['Datos_Cruzados Efecty']
-        columnas_pesos_efecty = ["VALOR MOVILIZADO", "VALOR COMISIÓN", "IVA", "TOTAL LIQUIDACIÓN"]
-        for i, col in enumerate(df1.columns):
-            if col in columnas_pesos_efecty:
-                hoja1.set_column(i, i, 18, formato_pesos)
-            else:
-                hoja1.set_column(i, i, 18)
-
-        # --- Hoja: Datos_Cruzados Siigo ---
-        df7.to_excel(writer, sheet_name='Datos_Cruzados Siigo', index=False)
-        hoja7 = writer.sheets['Datos_Cruzados Siigo']
-        for i, col in enumerate(df7.columns):
-            if col == "DÉBITO":
-                hoja7.set_column(i, i, 18, formato_pesos)
-            else:
-                hoja7.set_column(i, i, 18)
-
-        # --- Hoja: Resumen_Recaudo ---
-        df2.to_excel(writer, sheet_name='Resumen_Recaudo', startrow=1, startcol=1, index=False)
-        df3.to_excel(writer, sheet_name='Resumen_Recaudo', startrow=1, startcol=7, index=False)
-        df4.to_excel(writer, sheet_name='Resumen_Recaudo', startrow=1, startcol=10, index=False)
-        df5.to_excel(writer, sheet_name='Resumen_Recaudo', startrow=1, startcol=16, index=False)
-        hoja_recaudo = writer.sheets['Resumen_Recaudo']
-        hoja_recaudo.set_column(1, 20, 18)
-
-        # --- Hoja: Recaudo_Acumulado ---
-        df6.to_excel(writer, sheet_name='Recaudo_Acumulado', startrow=0, startcol=0, index=False)
-        hoja6 = writer.sheets['Recaudo_Acumulado']
-        for i, col in enumerate(df6.columns):
-            if "VALOR" in col or "DÉBITO" in col:
-                hoja6.set_column(i, i, 18, formato_pesos)
-            else:
-                hoja6.set_column(i, i, 18)
-
-    output.seek(0)
-    return output
-
-def generar_csv(df):
-    output = BytesIO()
-    df.to_csv(output, index=False, encoding='utf-8')
-    output.seek(0)
-    return output
+import tempfile
+import zipfile
+from contextlib import closing
+from functools import partial
+
+from recaudo import (ErrorCruce, exportar_tabla, generar_csv, generar_xlsx, generar_xlsx_cartera, leer_excel,
+                     procesar_cartera, procesar_recaudo)
+from recaudo.cartera import fuentes_subidas
+from recaudo.acumulado import (abrir_acumulado, agregar_al_acumulado, contar_acumulado, importar_acumulado,
+                               leer_acumulado, unir_con_acumulado)
+from recaudo.exportar import FORMATOS_TABLA, generar_xlsx_acumulado
+from recaudo.lectura import ARCHIVOS_RECAUDO
+from recaudo.lote import procesar_lote
+from recaudo.medicion import Medicion, etapa
+
+# Los procesos de los pools de Lote y Cartera (spawn) importan este script como "__mp_main__":
+# la página solo se dibuja cuando Streamlit lo ejecuta como "__main__"
+opcion = None
+if __name__ == "__main__":
+    # Configuración inicial de la app
+    st.set_page_config(page_title="Recaudo y Cartera", page_icon="📊", layout="wide")
+
+    # Título principal
+    st.title("📊 Captura de Datos")
+
+    # Menú de selección
+    opcion = st.sidebar.selectbox("Selecciona una opción:", ["Inicio", "Recaudo", "Cartera"])
+
+# ------------------- FUNCIONES -------------------
+
+# Carga cacheada: Streamlit indexa la caché por el contenido (bytes) del archivo,
+# así un mismo Excel solo se lee una vez por sesión aunque la página se re-ejecute.
+# max_entries limita la memoria cuando se suben muchas versiones de los archivos.
+@st.cache_data(max_entries=20, show_spinner=False)
+def cargar_excel(contenido, columnas, tipos=None):
+    return leer_excel(BytesIO(contenido), columnas, tipos)
+
+
+@st.cache_data(max_entries=5, show_spinner=False)
+def cargar_carteras(archivos):
+    # archivos: tupla de (nombre, contenido) de los Excel de órdenes de Cartera, en el orden de subida
+    return procesar_cartera(fuentes_subidas(archivos))
+
+
+# Descargas diferidas: st.download_button llama a estas funciones solo cuando se pulsa el botón,
+# así el Excel y las tablas exportadas no se regeneran en cada re-ejecución de la página
+def contenido(generar, *args):
+    with generar(*args) as archivo:
+        return archivo.read()
+
+
+# Excel con la base acumulada local completa (todos los periodos)
+def xlsx_base_acumulada(ruta):
+    with closing(abrir_acumulado(ruta)) as con:
+        return contenido(generar_xlsx_acumulado, leer_acumulado(con))
+
+
+FILAS_POR_PAGINA = 100
+
+# Vista paginada de una tabla: resumen y filtro sobre todo el DataFrame, pero solo la página
+# visible se envía al navegador (st.dataframe serializa todas las filas que recibe).
+# Las columnas_pesos se muestran como "$1.234.567" con un Styler sobre esa página: los datos
+# siguen siendo numéricos y no se copia ni se recorre la tabla completa.
+# Es un fragmento: filtrar o cambiar de página re-ejecuta solo esta vista, no el cruce.
+@st.fragment
+def mostrar_tabla(df, titulo, clave, expandida=False, columnas_pesos=()):
+    filas = f"{len(df):,}".replace(",", ".")
+    with st.expander(f"{titulo} — {filas} filas × {df.shape[1]} columnas", expanded=expandida):
+        col1, col2, col3 = st.columns([2, 3, 1])
+        with col1:
+            columna = st.selectbox("Filtrar columna", ["(ninguna)"] + [str(col) for col in df.columns],
+                                   key=f"{clave}_columna")
+        with col2:
+            texto = st.text_input("Contiene", key=f"{clave}_texto", disabled=columna == "(ninguna)")
+
+        if columna != "(ninguna)" and texto:
+            posicion = [str(col) for col in df.columns].index(columna)
+            valores = df.iloc[:, posicion].astype(str)
+            df = df[valores.str.contains(texto, case=False, regex=False).to_numpy()]
+
+        paginas = max(1, -(-len(df) // FILAS_POR_PAGINA))
+        with col3:
+            pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1,
+                                     step=1, key=f"{clave}_pagina_{paginas}")
+
+        inicio = (pagina - 1) * FILAS_POR_PAGINA
+        vista = df.iloc[inicio:inicio + FILAS_POR_PAGINA]
+        columnas_pesos = [col for col in columnas_pesos if col in vista.columns]
+        if columnas_pesos:
+            vista = vista.style.format("${:,.0f}", subset=columnas_pesos, thousands=".", na_rep="")
+        st.dataframe(vista)
+        st.caption(f"Filas {min(inicio + 1, len(df))}–{min(inicio + FILAS_POR_PAGINA, len(df))} de {len(df)}")
+
+
+ETIQUETAS_FORMATO = {"parquet": "Parquet", "csv": "CSV", "csv.gz": "CSV (gzip)"}
+
+# Exportación rápida de una tabla a la vez (Parquet o CSV por bloques); solo se genera la tabla elegida
+# y solo al pulsar la descarga. Como fragmento, elegir tabla o formato no re-ejecuta la página.
+@st.fragment
+def descargar_tabla(tablas, nombre_archivo, clave):
+    col1, col2 = st.columns(2)
+    with col1:
+        nombre = st.selectbox("Tabla", list(tablas), key=f"{clave}_tabla")
+    with col2:
+        formato = st.radio("Formato", list(FORMATOS_TABLA), format_func=ETIQUETAS_FORMATO.get,
+                           horizontal=True, key=f"{clave}_formato")
 
-def formato_pesos(valor):
+    extension, mime, _ = FORMATOS_TABLA[formato]
     try:
-        return f"${valor:,.0f}".replace(",", ".")
-    except:
-        return valor
+        # Exportar la tabla sin filas es inmediato y avisa ya si falta la librería del formato
+        contenido(exportar_tabla, tablas[nombre].iloc[:0], formato)
+    except ImportError as error:
+        st.warning(f"⚠️ {error}")
+        return
+    st.download_button(label=f"📥 Descargar {nombre} ({ETIQUETAS_FORMATO[formato]})",
+                       data=partial(contenido, exportar_tabla, tablas[nombre], formato),
+                       file_name=f"{nombre_archivo}_{nombre}{extension}", mime=mime, key=f"{clave}_descarga",
+                       on_click="ignore")
 
 
 # ------------------- SECCIÓN DE FACTURACIÓN -------------------
@@ -97,274 +142,162 @@ if opcion == "Recaudo":
     with col5:
         archivo_acumulado = st.file_uploader("📂 Cargar archivo Excel - Acumulado", type=["xlsx"])
 
+    # Modo lote: un .zip con una carpeta por proyecto/mes, cruzadas en paralelo
+    with st.expander("📦 Modo lote (varios proyectos o meses en un .zip)"):
+        archivo_lote = st.file_uploader("📂 Cargar .zip con una carpeta por juego de archivos", type=["zip"])
+        if archivo_lote and st.button("▶️ Procesar lote"):
+            with tempfile.TemporaryDirectory() as temporal:
+                ruta_zip = os.path.join(temporal, "lote.zip")
+                with open(ruta_zip, "wb") as archivo:
+                    archivo.write(archivo_lote.getvalue())
+
+                carpeta_salida = os.path.join(temporal, "salida")
+                progreso = st.progress(0.0)
+                resumen_lote = procesar_lote(
+                    ruta_zip, carpeta_salida,
+                    al_terminar=lambda fila, hechos, total: progreso.progress(hechos / total, text=fila["JUEGO"])
+                )
 
-    if archivo_liquidacion and archivo_ordenes and archivo_provision:
-        # Cargar los datos en DataFrames
-        df_liqui = pd.read_excel(archivo_liquidacion)
-        df_ordenes = pd.read_excel(archivo_ordenes)
-        df_provision = pd.read_excel(archivo_provision)
-        df_siigo = pd.read_excel(archivo_siigo)
-        df_acumulado = pd.read_excel(archivo_acumulado)
-
-        # Normalizar nombres de columnas
-        df_liqui.columns = df_liqui.columns.str.strip().str.upper()
-        df_ordenes.columns = df_ordenes.columns.str.strip().str.upper()
-        df_provision.columns = df_provision.columns.str.strip().str.upper()
-        df_siigo.columns = df_siigo.columns.str.strip().str.upper()
-        df_acumulado.columns = df_acumulado.columns.str.strip().str.upper()
-
-
-        columnas_liqui = ["DOCUMENTO", "CÓDIGO PROYECTO", "FECHA", "FORMA DE PAGO", 
-                          "CÓDIGO PUNTO DE SERVICIO", "VALOR MOVILIZADO", "VALOR COMISIÓN", 
-                          "IVA", "TOTAL LIQUIDACIÓN", "ANO"]
-        columnas_ordenes = ["NUMERO_ORDEN", "IDENTIFICACION", "NOMBRES", "APELLIDO1", "APELLIDO2", "FACTURA"]
-        columnas_provision = ["NUI", "CC", "PROYECTO"]
-        columnas_siigo = ["CÓDIGO CONTABLE", "CUENTA CONTABLE", "COMPROBANTE", "SECUENCIA", "FECHA ELABORACIÓN" 
-                            , "NOMBRE DEL TERCERO", "DESCRIPCIÓN", "CENTRO DE COSTO", "DÉBITO"]
-        columnas_acumulado = ["MEDIO DE PAGO","MEDIO DE RECAUDO","FECHA", "MES", "AÑO", "CÓDIGO PUNTO DE SERVICIO", "ORDEN DE SERVICIO", "VALOR MOVILIZADO","VALOR COMISIÓN",
-                              "IVA", "TOTAL LIQUIDACIÓN", "NUI", "CEDULA", "NOMBRE", "FACTURA", "MUNICIPIO","VALIDADO","COMPROBANTE CONTABLE"]
-
-        df_liqui = df_liqui[[col for col in columnas_liqui if col in df_liqui.columns]]
-        df_ordenes = df_ordenes[[col for col in columnas_ordenes if col in df_ordenes.columns]]
-        df_provision = df_provision[[col for col in columnas_provision if col in df_provision.columns]]
-        df_siigo = df_siigo[[col for col in columnas_siigo if col in df_siigo.columns]]
-        df_acumulado = df_acumulado[[col for col in columnas_acumulado if col in df_acumulado.columns]]
-
-        if all(col in df_ordenes.columns for col in ["NOMBRES", "APELLIDO1", "APELLIDO2"]):
-            df_ordenes["NOMBRE_COMPLETO"] = (
-                df_ordenes["NOMBRES"].fillna('').apply(lambda x: unidecode.unidecode(x)) + " " +
-                df_ordenes["APELLIDO1"].fillna('').apply(lambda x: unidecode.unidecode(x)) + " " +
-                df_ordenes["APELLIDO2"].fillna('').apply(lambda x: unidecode.unidecode(x))
-            ).str.strip()
-
-        df1, df2, df3, df4, df5 = len(df_liqui), len(df_ordenes), len(df_provision), len(df_siigo), len(df_acumulado)
-
-        
-        #st.dataframe(df_acumulado)
-
-        # Se separa numero de factura y cedula
-        df_siigo['DESCRIPCIÓN'] = df_siigo['DESCRIPCIÓN'].str.replace(r'-\s+', '-', regex=True)
-        df_siigo[['FACTURA', 'IDENTIFICACION']] = df_siigo['DESCRIPCIÓN'].str.extract(r'^FV-\d+-(\d+)\s+(\d+)')
-        #st.dataframe(df_siigo[['FACTURA', 'IDENTIFICACION']])
-
-        #st.write("Base inicial Siigo")
-        #st.dataframe(df_siigo)
-
-        #Formatear los datos a STR
-        df_siigo['IDENTIFICACION'] = df_siigo['IDENTIFICACION'].astype(str).str.strip()
-        df_provision['CC'] = df_provision['CC'].astype(str).str.strip()
-
-        # Cruce entre Siigo y Usuarios para traer NUI
-        df_siigo_nui = df_siigo.merge(df_provision[['CC', 'NUI']], left_on="IDENTIFICACION", right_on="CC", how="inner").drop(columns=["CC"])
-        
-        if df1 == df2:
-            df_merged = df_liqui.merge(df_ordenes, left_on="DOCUMENTO", right_on="NUMERO_ORDEN", how="inner")
-
-            #st.success("✅ Datos cruzados correctamente.")
-            df_merged = df_merged.drop(columns=["NOMBRES", "APELLIDO1", "APELLIDO2"]).reset_index(drop=True)
-
-            if "IDENTIFICACION" in df_merged.columns and "NUI" in df_provision.columns:
-                df_total = df_merged.merge(df_provision, left_on="IDENTIFICACION", right_on="NUI", how="inner")
-
-                # Insertar un espacio entre 'FE' y un número si está pegado
-                df_total["FACTURA"] = df_total["FACTURA"].astype(str).str.replace(r"\bFE(?=\d)", "FE ", regex=True)
-
-                # Eliminar 'FE' (seguido o no de espacio)
-                df_total["FACTURA"] = df_total["FACTURA"].str.replace(r"\bFE\s*", "", regex=True)
-
-
-                # Establecer localización en español según el sistema operativo
-                sistema = platform.system()
-                try:
-                    if sistema == "Windows":
-                        locale.setlocale(locale.LC_TIME, 'Spanish_Spain.1252')
-                except locale.Error:
-                    st.warning("⚠️ No se pudo establecer la localización en español. El nombre del mes podría mostrarse en inglés.")
-
-                # 📅 Separar FECHA en AÑO y MES (en español)
-                # Crear diccionario de meses en español (en mayúsculas)
-                meses_es = {
-                    'JANUARY': 'ENERO',
-                    'FEBRUARY': 'FEBRERO',
-                    'MARCH': 'MARZO',
-                    'APRIL': 'ABRIL',
-                    'MAY': 'MAYO',
-                    'JUNE': 'JUNIO',
-                    'JULY': 'JULIO',
-                    'AUGUST': 'AGOSTO',
-                    'SEPTEMBER': 'SEPTIEMBRE',
-                    'OCTOBER': 'OCTUBRE',
-                    'NOVEMBER': 'NOVIEMBRE',
-                    'DECEMBER': 'DICIEMBRE'
-                }
-                
-                # Convertir a datetime y extraer año y mes en español
-                df_total['FECHA'] = pd.to_datetime(df_total['FECHA'], errors='coerce')
-                df_total['AÑO'] = df_total['FECHA'].dt.year
-                df_total['MES'] = df_total['FECHA'].dt.strftime('%B').str.upper().map(meses_es)
-
-                st.success("✅ Cruce total correcto.")
-                st.write("Base Efecty")
-                st.dataframe(df_liqui)
-                st.dataframe(df_total)
-                st.dataframe(df_merged)
-                st.write("Base Siigo")
-                st.dataframe(df_siigo_nui)
-
-
-################################################################################################################################################
-
-                col1, col2 = st.columns(2)
-
-                # Estandarizar nombres de columnas (en mayúsculas y sin espacios)
-                df_total.columns = df_total.columns.str.upper().str.strip()
-                df_siigo.columns = df_siigo.columns.str.upper().str.strip()
-
-                with col1:
-                    sum_val_movil = df_total.groupby("CC")["VALOR MOVILIZADO"].sum().reset_index()
-                    sum_total_val_movil = df_total["VALOR MOVILIZADO"].sum()
-                    
-                    # Agregar fila de total
-                    total_row = pd.DataFrame([["TOTAL GENERAL", sum_total_val_movil]], columns=["CC", "VALOR MOVILIZADO"])
-                    sum_val_movil = pd.concat([sum_val_movil, total_row], ignore_index=True)
-                    
-                    #st.dataframe(sum_val_movil)
-
-                with col2:
-                    sum_siigo = df_siigo.groupby('IDENTIFICACION')["DÉBITO"].sum().reset_index()
-                    sum_total_siigo = df_siigo["DÉBITO"].sum()
-                    
-                    # Agregar fila de total
-                    total_row_siigo = pd.DataFrame([["TOTAL GENERAL", sum_total_siigo]], columns=["IDENTIFICACION", "DÉBITO"])
-                    sum_siigo = pd.concat([sum_siigo, total_row_siigo], ignore_index=True)
-                    
-                    #st.dataframe(sum_siigo)
+                salida_lote = BytesIO()
+                with zipfile.ZipFile(salida_lote, "w", zipfile.ZIP_DEFLATED) as comprimido:
+                    for nombre in sorted(os.listdir(carpeta_salida)):
+                        comprimido.write(os.path.join(carpeta_salida, nombre), nombre)
+                salida_lote.seek(0)
+
+            if resumen_lote.empty:
+                st.warning("⚠️ No se encontraron carpetas con los cinco archivos (Liquidación, Órdenes, Provisión, Siigo y Acumulado).")
+            else:
+                st.dataframe(resumen_lote)
+                st.download_button(label="📥 Descargar resultados del lote", data=salida_lote,
+                                   file_name="resultados_lote.zip", mime="application/zip", on_click="ignore")
+
+    # Base acumulada local: el lote se agrega a una base SQLite en vez de re-subir el Acumulado completo
+    ruta_base = os.environ.get("RECAUDO_BASE_ACUMULADO", "acumulado.sqlite")
+    usar_base = st.checkbox(f"🗄️ Usar base acumulada local ({ruta_base})", value=os.path.exists(ruta_base),
+                            help="El Excel del Acumulado solo se necesita la primera vez, para llenar la base.")
+
+    # Medición opcional por etapa (tiempo y filas), mostrada en la barra lateral. El pico de memoria
+    # usa tracemalloc, que hace el cruce varias veces más lento y es uno solo para todo el servidor:
+    # se pide aparte y, si otra sesión ya lo está usando, la columna de memoria queda vacía
+    medicion = None
+    if st.sidebar.checkbox("⏱️ Medir etapas del cruce"):
+        memoria = st.sidebar.checkbox("Incluir pico de memoria (más lento)")
+        medicion = Medicion(memoria=memoria)
+
+    archivos = [archivo_liquidacion, archivo_ordenes, archivo_provision, archivo_siigo, archivo_acumulado]
+
+    if all(archivos[:4]) and (usar_base or archivo_acumulado):
+        # Cargar los datos en DataFrames (cacheados por contenido, con columnas normalizadas y filtradas)
+        dataframes = []
+        for archivo, (rol, (columnas, tipos)) in zip(archivos, ARCHIVOS_RECAUDO.items()):
+            if archivo is None or (usar_base and archivo is archivo_acumulado):
+                dataframes.append(None)
+                continue
+            with etapa(medicion, f"leer {rol}") as registro:
+                dataframes.append(cargar_excel(archivo.getvalue(), columnas, tipos))
+                registro["FILAS"] = len(dataframes[-1])
+        df_liqui, df_ordenes, df_provision, df_siigo, df_acumulado = dataframes
+
+        try:
+            resultado = procesar_recaudo(df_liqui, df_ordenes, df_provision, df_siigo, df_acumulado,
+                                         medicion=medicion)
+        except ErrorCruce as error:
+            st.warning(f"⚠️ {error}")
+        else:
+            if usar_base:
+                with closing(abrir_acumulado(ruta_base)) as con, etapa(medicion, "base acumulada") as registro:
+                    if archivo_acumulado and contar_acumulado(con) == 0:
+                        with st.spinner("Importando el Acumulado a la base local..."):
+                            importar_acumulado(con, BytesIO(archivo_acumulado.getvalue()))
+                    resultado.df_unido = unir_con_acumulado(con, resultado.df_para_agregar)
+                    total_acumulado = contar_acumulado(con)
+                    registro["FILAS"] = len(resultado.df_unido)
+            else:
+                total_acumulado = len(resultado.df_acumulado)
+
+            st.success("✅ Cruce total correcto.")
+            st.write("Base Efecty")
+            mostrar_tabla(df_liqui, "Liquidación", "liqui")
+            mostrar_tabla(resultado.df_total, "Cruce Efecty (Liquidación, Órdenes y Provisión)", "total")
+            mostrar_tabla(resultado.df_merged, "Cruce Liquidación y Órdenes", "merged")
+            st.write("Base Siigo")
+            mostrar_tabla(resultado.df_siigo_nui, "Cruce Siigo y Provisión", "siigo_nui")
 
 ###############################################################################################################################################
-                
-                st.subheader("Diferencias Efecty vs Siigo", divider="blue")
-                
-                # Convertir claves a string antes del merge
-
-                sum_val_movil["CC"] = sum_val_movil["CC"]#.astype(str)
-                sum_siigo["IDENTIFICACION"] = sum_siigo["IDENTIFICACION"]#.astype(str)
-                #sum_siigo["IDENTIFICACION"] = pd.to_numeric(sum_siigo["IDENTIFICACION"], errors="coerce")
-
-                # Merge usando columnas diferentes
-                solo_df1 = sum_val_movil.merge(
-                    sum_siigo,
-                    left_on='CC',
-                    right_on='IDENTIFICACION',
-                    how='left',
-                    suffixes=('_df_sum_val_movil', '_df2_sum_siigo')
-                )
-                # Calcular diferencias entre VALOR MOVILIZADO y DÉBITO
-                solo_df1["DIFERENCIA_EFECTY_SIIGO"] = solo_df1["VALOR MOVILIZADO"] - solo_df1["DÉBITO"]
-                #solo_df1["DIFERENCIA_SIIGO_EFECTY"] = solo_df1["DÉBITO"] - solo_df1["VALOR MOVILIZADO"]
 
-                df_solo_df1_fmt = solo_df1.copy()
-                df_solo_df1_fmt["VALOR MOVILIZADO"] = df_solo_df1_fmt["VALOR MOVILIZADO"].apply(formato_pesos)
-                df_solo_df1_fmt["DÉBITO"] = df_solo_df1_fmt["DÉBITO"].apply(formato_pesos)
-                df_solo_df1_fmt["DIFERENCIA_EFECTY_SIIGO"] = df_solo_df1_fmt["DIFERENCIA_EFECTY_SIIGO"].apply(formato_pesos)
+            st.subheader("Diferencias Efecty vs Siigo", divider="blue")
 
-                st.dataframe(df_solo_df1_fmt)
+            mostrar_tabla(resultado.solo_df1, "Efecty vs Siigo", "solo_df1", expandida=True,
+                          columnas_pesos=["VALOR MOVILIZADO", "DÉBITO", "DIFERENCIA_EFECTY_SIIGO"])
+            mostrar_tabla(resultado.resultado_1, "En Efecty y no en Siigo", "resultado_1", expandida=True,
+                          columnas_pesos=["VALOR MOVILIZADO"])
+
+###############################################################################################################################################
 
-                # Filtrar los que no están en sum_siigo
-                no_en_sum_siigo = solo_df1[solo_df1["DÉBITO"].isna()]
-                resultado_1 = no_en_sum_siigo[['CC', 'VALOR MOVILIZADO']]
+            st.subheader("Diferencias Siigo vs Efecty", divider="blue")
 
-                df_resultado_1 = resultado_1.copy()
-                df_resultado_1['VALOR MOVILIZADO'] = df_resultado_1['VALOR MOVILIZADO'].apply(formato_pesos)
-                st.dataframe(df_resultado_1)
+            mostrar_tabla(resultado.solo_df2, "Siigo vs Efecty", "solo_df2", expandida=True,
+                          columnas_pesos=["DÉBITO", "VALOR MOVILIZADO", "DIFERENCIA_SIIGO_EFECTY"])
+            mostrar_tabla(resultado.resultado_2, "En Siigo y no en Efecty", "resultado_2", expandida=True,
+                          columnas_pesos=["DÉBITO"])
 
 ###############################################################################################################################################
 
-                st.subheader("Diferencias Siigo vs Efecty", divider="blue")
+            st.subheader("📋 Base Unida Acumulada")
+            mostrar_tabla(resultado.df_unido, "Base unida (periodos del lote)" if usar_base else "Base unida", "unido")
 
-                # Merge usando columnas diferentes
-                solo_df2 = sum_siigo.merge(
-                    sum_val_movil,
-                    left_on='IDENTIFICACION',
-                    right_on='CC',
-                    how='left',
-                    suffixes=('_df2_sum_siigo', '_df_sum_val_movil')
-                )
-                #solo_df2["DIFERENCIA_EFECTY_SIIGO"] = solo_df2["VALOR MOVILIZADO"] - solo_df2["DÉBITO"]
-                solo_df2["DIFERENCIA_SIIGO_EFECTY"] = solo_df2["DÉBITO"] - solo_df2["VALOR MOVILIZADO"]
+            st.subheader("Totales:")
 
-                df_solo_df2_fmt = solo_df2.copy()
-                df_solo_df2_fmt["DÉBITO"] = df_solo_df2_fmt["DÉBITO"].apply(formato_pesos)
-                df_solo_df2_fmt["VALOR MOVILIZADO"] = df_solo_df2_fmt["VALOR MOVILIZADO"].apply(formato_pesos)
-                df_solo_df2_fmt["DIFERENCIA_SIIGO_EFECTY"] = df_solo_df2_fmt["DIFERENCIA_SIIGO_EFECTY"].apply(formato_pesos)
+            # Columnas para cargar archivos
+            col1, col2, col3= st.columns(3)
 
-                st.dataframe(df_solo_df2_fmt)
+            with col1:
+                st.write("Acumulada:", total_acumulado)
+            with col2:
+                st.write("Agregar:", len(resultado.df_para_agregar))
+            with col3:
+                st.write("Unida:", len(resultado.df_unido))
 
-                #Resultado o diferencias
-                no_en_sum_val_movil = solo_df2[solo_df2['VALOR MOVILIZADO'].isna()]
-                resultado_2 = no_en_sum_val_movil[['IDENTIFICACION', 'DÉBITO']]
+            # Con la base local solo se escriben los registros nuevos (las órdenes repetidas se ignoran)
+            if usar_base and st.button("💾 Registrar lote en la base acumulada"):
+                with closing(abrir_acumulado(ruta_base)) as con:
+                    agregados = agregar_al_acumulado(con, resultado.df_para_agregar)
+                    st.success(f"✅ {agregados} registros agregados; la base tiene {contar_acumulado(con)}.")
 
-                df_resultado_2 = resultado_2.copy()
-                df_resultado_2['DÉBITO'] = df_resultado_2['DÉBITO'].apply(formato_pesos)
-                st.dataframe(df_resultado_2)
+            # La hoja Recaudo_Acumulado del Excel solo trae los periodos del lote; el histórico va aparte
+            if usar_base:
+                st.caption("ℹ️ Con la base local, la hoja Recaudo_Acumulado del Excel trae solo los periodos "
+                           "(AÑO/MES) del lote. Para usar como Acumulado de otro mes, descargue la base completa.")
+                st.download_button(
+                    label="📥 Descargar base acumulada completa",
+                    data=partial(xlsx_base_acumulada, ruta_base),
+                    file_name="Recaudo_Acumulado.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    on_click="ignore"
+                )
 
 ###############################################################################################################################################
-                
-                #st.write("Base para agregar al Acumulado")
-                df_organizable = df_total.copy()
-                df_para_agregar = df_organizable[["FECHA", "MES", "AÑO", "CÓDIGO PUNTO DE SERVICIO", "NUMERO_ORDEN", "VALOR MOVILIZADO","VALOR COMISIÓN",
-                                                  "IVA", "TOTAL LIQUIDACIÓN", "NUI", "CC", "NOMBRE_COMPLETO", "FACTURA", "PROYECTO"]]
-                # Agregar columna con valor fijo
-                # Insertar columna al inicio (posición 0)
-                df_para_agregar.insert(0, "MEDIO DE PAGO", "EFECTY")
-                df_para_agregar.insert(1, "MEDIO DE RECAUDO", "")
-                df_para_agregar.insert(16, "VALIDADO", "")
-                df_para_agregar.insert(17, "COMPROBANTE CONTABLE", "")
-                
-                # Renombrar columnas de df_para_agregar para que coincidan con las de df_acumulado
-                df_para_agregar = df_para_agregar.rename(columns={
-                    "NUMERO_ORDEN": "ORDEN DE SERVICIO",
-                    "CC": "CEDULA",
-                    "NOMBRE_COMPLETO": "NOMBRE",
-                    "PROYECTO": "MUNICIPIO"
-                })
-                #st.dataframe(df_para_agregar)
-
-                st.subheader("📋 Base Unida Acumulada")
-                # Asegurar que ambos DataFrames tengan el mismo número de columnas
-                min_cols = min(df_acumulado.shape[1], df_para_agregar.shape[1])
-                df_acumulado = df_acumulado.iloc[:, :min_cols]
-                df_para_agregar = df_para_agregar.iloc[:, :min_cols]
-
-                df_unido = pd.concat([df_para_agregar,df_acumulado], axis=0, ignore_index=True)
-                st.dataframe(df_unido)
-
-                st.subheader("Totales:")
-
-                # Columnas para cargar archivos
-                col1, col2, col3= st.columns(3)
-
-                with col1:
-                    st.write("Acumulada:", len(df_acumulado))
-                with col2:
-                    st.write("Agregar:", len(df_para_agregar))
-                with col3:
-                    st.write("Unida:", len(df_unido))
 
-###############################################################################################################################################
+            # Descargar resultado con todas las hojas; el libro se genera al pulsar el botón (en un
+            # archivo temporal), por eso su escritura no aparece en la medición por etapa
+            st.download_button(
+                label="📥 Descargar Excel",
+                data=partial(contenido, generar_xlsx, *resultado.hojas_xlsx()),
+                file_name="datos_cruzados.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                on_click="ignore"
+            )
 
+            st.subheader("📤 Exportar tablas (Parquet / CSV)")
+            descargar_tabla(resultado.tablas(), "datos_cruzados", "recaudo")
 
-                # Descargar resultado con dos hojas
-                xlsx = generar_xlsx(df_total, solo_df1, resultado_1, solo_df2, resultado_2, df_unido, df_siigo_nui)
-                st.download_button(
-                    label="📥 Descargar Excel",
-                    data=xlsx,
-                    file_name="datos_cruzados.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-            else:
-                st.warning("⚠️ No se encontraron las columnas 'IDENTIFICACION' o 'NUI' para realizar el segundo cruce.")
-        else:
-            st.warning("⚠️ Las bases de datos cargadas no tienen la misma cantidad de registros. Por favor, validar antes de cargar.")
+        if medicion is not None:
+            with st.sidebar:
+                st.subheader("⏱️ Medición por etapa")
+                st.dataframe(medicion.tabla(), hide_index=True)
+                st.caption(f"Total: {medicion.a_dict()['segundos_totales']:.2f} s")
+                st.download_button(label="📥 Descargar medición (JSON)", data=medicion.a_json(),
+                                   file_name="medicion_recaudo.json", mime="application/json", on_click="ignore")
 
 
 # ------------------- SECCIÓN DE FACTURACIÓN -------------------
@@ -373,43 +306,42 @@ if opcion == "Recaudo":
 elif opcion == "Cartera":
     st.subheader("💰 Procesamiento de Cartera")
 
-    archivo = st.file_uploader("📂 Cargar archivo Excel", type=["xlsx"])
-
-    if archivo is not None:
-        df = pd.read_excel(archivo)
-
-        # Obtener el nombre del archivo
-        nombre_archivo = archivo.name  
-
-        # Definir las columnas a filtrar
-        columnas_deseadas = ["NUMERO_ORDEN", "IDENTIFICACION", "NOMBRES", "APELLIDO1", "APELLIDO2", "FACTURA"]
-        columnas_presentes = [col for col in columnas_deseadas if col in df.columns]
-
-        # Filtrar columnas
-        df_filtrado = df[columnas_presentes]
+    archivos_cartera = st.file_uploader("📂 Cargar archivos Excel de órdenes", type=["xlsx"],
+                                        accept_multiple_files=True,
+                                        help="Súbalos del más antiguo al más reciente: una orden repetida "
+                                             "se toma del último archivo subido.")
 
-        # Agregar el nombre del archivo como una nueva columna
-        #df_filtrado.insert(0, "nombre_archivo", nombre_archivo)
+    if archivos_cartera:
+        # Los archivos se leen en paralelo (un proceso por archivo) y el resultado queda en caché
+        # mientras no cambie el conjunto de archivos
+        with st.spinner(f"Procesando {len(archivos_cartera)} archivos..."):
+            resultado_cartera = cargar_carteras(tuple((archivo.name, archivo.getvalue())
+                                                      for archivo in archivos_cartera))
+        df_cartera = resultado_cartera.df_cartera
 
-        # Reemplazar valores vacíos o NaN con "NA"
-        df_filtrado.fillna("NA", inplace=True)
+        for fila in resultado_cartera.resumen.itertuples(index=False):
+            if fila.ESTADO != "OK":
+                st.warning(f"⚠️ {fila.ARCHIVO}: {fila.ESTADO}")
 
-        # Limpieza de datos
-        if "Fecha" in df_filtrado.columns:
-            df_filtrado["Fecha"] = pd.to_datetime(df_filtrado["Fecha"], errors='coerce').dt.strftime('%d-%m-%Y').fillna("NA")
+        st.success(f"✅ {len(df_cartera)} órdenes de {len(archivos_cartera)} archivos "
+                   f"({resultado_cartera.duplicadas} repetidas descartadas).")
+        mostrar_tabla(resultado_cartera.resumen, "Archivos cargados", "cartera_archivos")
+        if resultado_cartera.duplicadas:
+            st.warning(f"⚠️ {resultado_cartera.duplicadas} filas de órdenes repetidas se descartaron; se conservó "
+                       "la del último archivo subido. Revise la tabla de órdenes repetidas.")
+            mostrar_tabla(resultado_cartera.repetidas, "Órdenes repetidas", "cartera_repetidas")
+        mostrar_tabla(df_cartera, "Cartera", "cartera", expandida=True)
 
-        st.success("✅ Archivo procesado correctamente.")
-        st.dataframe(df_filtrado)
+        # Botones de descarga (cada archivo se genera al pulsar su botón)
+        st.download_button(label="📥 Descargar Excel", data=partial(contenido, generar_xlsx_cartera, resultado_cartera), file_name="facturacion_procesada.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", on_click="ignore")
 
-        # Botones de descarga
-        xlsx = generar_xlsx(df_filtrado)
-        st.download_button(label="📥 Descargar Excel", data=xlsx, file_name="facturacion_procesada.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        st.download_button(label="📥 Descargar CSV", data=partial(contenido, generar_csv, df_cartera), file_name="facturacion_procesada.csv", mime="text/csv", on_click="ignore")
 
-        csv = generar_csv(df_filtrado)
-        st.download_button(label="📥 Descargar CSV", data=csv, file_name="facturacion_procesada.csv", mime="text/csv")
+        st.subheader("📤 Exportar (Parquet / CSV)")
+        descargar_tabla({"Cartera": df_cartera}, "facturacion_procesada", "cartera")
 
 # ------------------- PANTALLA INICIO -------------------
-else:
+elif opcion == "Inicio":
     st.write("👈 Usa el menú de la izquierda para seleccionar una opción.")
     st.markdown("""
         ### 📌 Instrucciones:
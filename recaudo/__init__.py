@@ -0,0 +1,38 @@
+from .acumulado import abrir_acumulado, agregar_al_acumulado, leer_acumulado
+from .bloques import ResultadoPorBloques, ejecutar_cruce_por_bloques
+from .cartera import ResultadoCartera, generar_xlsx_cartera, procesar_cartera
+from .claves import normalizar_clave, unir_por_indice
+from .cruce import ErrorCruce, ResultadoRecaudo, ejecutar_cruce, procesar_recaudo
+from .exportar import escribir_libro, exportar_tabla, generar_csv, generar_parquet, generar_xlsx
+from .lectura import MOTOR_EXCEL, cargar_recaudo, leer_excel, leer_excel_por_bloques
+from .lote import descubrir_juegos, procesar_lote
+from .medicion import Medicion
+
+__all__ = [
+    "ErrorCruce",
+    "MOTOR_EXCEL",
+    "Medicion",
+    "ResultadoCartera",
+    "ResultadoPorBloques",
+    "ResultadoRecaudo",
+    "abrir_acumulado",
+    "agregar_al_acumulado",
+    "cargar_recaudo",
+    "descubrir_juegos",
+    "ejecutar_cruce",
+    "ejecutar_cruce_por_bloques",
+    "escribir_libro",
+    "exportar_tabla",
+    "generar_csv",
+    "generar_parquet",
+    "generar_xlsx",
+    "generar_xlsx_cartera",
+    "leer_acumulado",
+    "leer_excel",
+    "leer_excel_por_bloques",
+    "normalizar_clave",
+    "procesar_cartera",
+    "procesar_lote",
+    "procesar_recaudo",
+    "unir_por_indice",
+]
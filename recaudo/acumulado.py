@@ -0,0 +1,117 @@
+import sqlite3
+
+import pandas as pd
+
+from .lectura import COLUMNAS_ACUMULADO, TIPOS_ACUMULADO, leer_excel, leer_excel_por_bloques
+
+# Base local del Recaudo Acumulado (SQLite): cada cruce agrega solo sus registros nuevos,
+# sin releer ni reescribir el histórico. ORDEN DE SERVICIO es única, así que volver a
+# registrar el mismo lote no duplica filas.
+TABLA = "acumulado"
+CLAVE = "ORDEN DE SERVICIO"
+
+# Límite de parámetros "?" por consulta (SQLite antiguo admite 999)
+PARAMETROS_POR_CONSULTA = 900
+
+
+def _columna(nombre):
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+def abrir_acumulado(ruta):
+    con = sqlite3.connect(ruta)
+    columnas = ", ".join(_columna(col) for col in COLUMNAS_ACUMULADO)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {TABLA} ({columnas})")
+    con.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{TABLA}_orden ON {TABLA} ({_columna(CLAVE)})")
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLA}_periodo ON {TABLA} ({_columna('AÑO')}, {_columna('MES')})")
+    return con
+
+
+def _preparar(df):
+    # Valores nativos de Python para sqlite3: clave como texto, AÑO entero y FECHA en ISO
+    df = df.reindex(columns=COLUMNAS_ACUMULADO)
+    df[CLAVE] = _clave_orden(df[CLAVE])
+    df["AÑO"] = pd.to_numeric(df["AÑO"], errors="coerce").astype("Int64")
+    if pd.api.types.is_datetime64_any_dtype(df["FECHA"]):
+        df["FECHA"] = df["FECHA"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    df = df.astype(object)
+    return df.where(df.notna(), None)
+
+
+def _clave_orden(serie):
+    # 12345, 12345.0 y " 12345" son la misma orden
+    texto = serie.astype(object).where(serie.notna(), None).map(lambda v: None if v is None else str(v).strip())
+    return texto.str.replace(r"\.0$", "", regex=True)
+
+
+def agregar_al_acumulado(con, df):
+    # Inserta las filas cuya ORDEN DE SERVICIO no está registrada y devuelve cuántas se agregaron
+    antes = con.total_changes
+    marcadores = ", ".join("?" for _ in COLUMNAS_ACUMULADO)
+    with con:
+        con.executemany(f"INSERT OR IGNORE INTO {TABLA} VALUES ({marcadores})",
+                        _preparar(df).itertuples(index=False, name=None))
+    return con.total_changes - antes
+
+
+def importar_acumulado(con, fuente, motor=None, filas_bloque=None):
+    # Carga inicial desde el Excel del Acumulado que se usaba antes de la base local.
+    # Con filas_bloque el Excel se lee e inserta por bloques, sin cargarlo entero en memoria.
+    if filas_bloque is None:
+        df = leer_excel(fuente, COLUMNAS_ACUMULADO, TIPOS_ACUMULADO, motor)
+        return agregar_al_acumulado(con, df)
+    bloques = leer_excel_por_bloques(fuente, COLUMNAS_ACUMULADO, TIPOS_ACUMULADO, filas_bloque)
+    return sum(agregar_al_acumulado(con, bloque) for bloque in bloques)
+
+
+def contar_acumulado(con):
+    return con.execute(f"SELECT COUNT(*) FROM {TABLA}").fetchone()[0]
+
+
+def periodos(df):
+    # Pares (AÑO, MES) presentes en un lote
+    pares = df[["AÑO", "MES"]].dropna().drop_duplicates()
+    return [(int(anio), mes) for anio, mes in pares.itertuples(index=False, name=None)]
+
+
+def leer_acumulado(con, periodos=None):
+    # Todo el histórico, o solo los periodos (AÑO, MES) indicados
+    consulta = f"SELECT * FROM {TABLA}"
+    parametros = []
+    if periodos is not None:
+        if not periodos:
+            return pd.DataFrame(columns=COLUMNAS_ACUMULADO)
+        condiciones = " OR ".join(f"({_columna('AÑO')} = ? AND {_columna('MES')} = ?)" for _ in periodos)
+        consulta += f" WHERE {condiciones}"
+        parametros = [valor for par in periodos for valor in par]
+
+    df = pd.read_sql_query(consulta, con, params=parametros)
+
+    # FECHA vuelve a datetime si todas las fechas están en ISO (las importadas como texto se dejan igual)
+    fechas = pd.to_datetime(df["FECHA"], format="ISO8601", errors="coerce")
+    if fechas.notna().sum() == df["FECHA"].notna().sum():
+        df["FECHA"] = fechas
+    return df
+
+
+def ordenes_registradas(con, claves):
+    # Claves (texto, como las guarda _preparar) que ya están en la base, en cualquier periodo
+    claves = list(pd.unique(claves.dropna()))
+    registradas = set()
+    for inicio in range(0, len(claves), PARAMETROS_POR_CONSULTA):
+        lote = claves[inicio:inicio + PARAMETROS_POR_CONSULTA]
+        marcadores = ", ".join("?" for _ in lote)
+        filas = con.execute(f"SELECT {_columna(CLAVE)} FROM {TABLA} WHERE {_columna(CLAVE)} IN ({marcadores})", lote)
+        registradas.update(clave for (clave,) in filas)
+    return registradas
+
+
+def unir_con_acumulado(con, df_para_agregar):
+    # Base unida del lote: registros nuevos arriba y, debajo, lo ya registrado en sus mismos periodos.
+    # "Nuevos" son los que agregar_al_acumulado insertaría: su orden no está en ningún periodo de la base.
+    df_periodo = leer_acumulado(con, periodos(df_para_agregar))
+    claves = _clave_orden(df_para_agregar[CLAVE])
+    nuevos = df_para_agregar[~claves.isin(ordenes_registradas(con, claves))]
+    if df_periodo.empty:
+        return nuevos.reset_index(drop=True)
+    return pd.concat([nuevos, df_periodo], axis=0, ignore_index=True)
@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+from itertools import chain
+
+import pandas as pd
+
+from .acumulado import abrir_acumulado, agregar_al_acumulado, contar_acumulado, importar_acumulado, unir_con_acumulado
+from .claves import normalizar_clave
+from .cruce import (base_para_agregar, conciliar_sumas, cruzar_efecty, cruzar_siigo_provision, preparar_entradas,
+                    separar_factura_siigo)
+from .exportar import HOJAS_RECAUDO, LibroPorBloques, bloques_resumen
+from .lectura import ARCHIVOS_RECAUDO, FILAS_BLOQUE, leer_excel, leer_excel_por_bloques
+from .medicion import Cronometro, etapa, registrar
+
+# Cruce fuera de memoria: Siigo y el Acumulado (los archivos que crecen con el histórico) se leen
+# por bloques y nunca se cargan enteros. Cada bloque de Siigo se cruza contra Provisión (pequeña,
+# en memoria), suma su DÉBITO por cédula y se escribe de inmediato en el Excel de salida; el
+# Acumulado pasa bloque a bloque a su hoja. Liquidación, Órdenes y Provisión son del lote y se
+# leen enteros, como en ejecutar_cruce.
+HOJA_EFECTY, HOJA_SIIGO, HOJA_RESUMEN, HOJA_ACUMULADO = (nombre for nombre, _ in HOJAS_RECAUDO)
+
+
+@dataclass
+class ResultadoPorBloques:
+    # Las tablas del lote y de la conciliación; de Siigo y el Acumulado solo quedan los conteos
+    df_merged: pd.DataFrame
+    df_total: pd.DataFrame
+    solo_df1: pd.DataFrame
+    resultado_1: pd.DataFrame
+    solo_df2: pd.DataFrame
+    resultado_2: pd.DataFrame
+    df_para_agregar: pd.DataFrame
+    filas_siigo: int
+    filas_siigo_nui: int
+    filas_acumulado: int
+    filas_unido: int
+
+
+class SumaPorClave:
+    # Suma de una columna agrupada por clave, acumulada bloque a bloque. Las claves se agrupan como
+    # texto (un bloque puede salir Int64 y otro texto) y se normalizan una sola vez al final.
+    def __init__(self, clave, valor):
+        self.clave = clave
+        self.valor = valor
+        self.suma = pd.Series(dtype="float64")
+        self.total = 0.0
+
+    def agregar(self, df):
+        parcial = df[self.valor].groupby(df[self.clave].astype("string")).sum()
+        self.suma = self.suma.add(parcial, fill_value=0)
+        self.total += df[self.valor].sum()
+
+    def resultado(self):
+        return pd.DataFrame({
+            self.clave: normalizar_clave(pd.Series(self.suma.index, dtype="string")),
+            self.valor: self.suma.to_numpy(),
+        })
+
+
+def _cronometrado(bloques, cronometro):
+    # Los mismos bloques, con el tiempo de leer cada uno sumado en cronometro
+    while True:
+        with cronometro:
+            bloque = next(bloques, None)
+        if bloque is None:
+            return
+        yield bloque
+
+
+def _acumulado_por_bloques(df_para_agregar, bloques):
+    # Filas de la hoja Recaudo_Acumulado en el orden de unir_acumulado: el lote y debajo el Acumulado,
+    # recortados al menor número de columnas de los dos
+    primero = next(bloques, None)
+    if primero is None:
+        yield df_para_agregar.reset_index(drop=True)
+        return
+    columnas = df_para_agregar.columns[:min(primero.shape[1], df_para_agregar.shape[1])]
+    yield df_para_agregar[columnas]
+    for bloque in chain([primero], bloques):
+        yield bloque.iloc[:, :len(columnas)].reindex(columns=columnas)
+
+
+def ejecutar_cruce_por_bloques(liquidacion, ordenes, provision, siigo, acumulado, salida, motor=None,
+                               base_acumulado=None, filas_bloque=FILAS_BLOQUE, medicion=None):
+    # Mismo cruce y mismo Excel que ejecutar_cruce, con memoria acotada por filas_bloque en lugar
+    # de por el tamaño de Siigo y del Acumulado (el Excel de salida se escribe en constant_memory)
+    with etapa(medicion, "leer lote (liquidación, órdenes, provisión)") as registro:
+        df_liqui, df_ordenes, df_provision = (
+            leer_excel(fuente, *ARCHIVOS_RECAUDO[rol], motor)
+            for fuente, rol in [(liquidacion, "liquidacion"), (ordenes, "ordenes"), (provision, "provision")]
+        )
+        registro["FILAS"] = len(df_liqui)
+
+    df_liqui, df_ordenes, df_provision = preparar_entradas(df_liqui, df_ordenes, df_provision, medicion)
+    with etapa(medicion, "cruce efecty (liquidación, órdenes, provisión)") as registro:
+        df_merged, df_total = cruzar_efecty(df_liqui, df_ordenes, df_provision)
+        df_para_agregar = base_para_agregar(df_total)
+        registro["FILAS"] = len(df_total)
+
+    with LibroPorBloques(salida, HOJAS_RECAUDO) as libro:
+        with etapa(medicion, "escribir efecty") as registro:
+            registro["FILAS"] = libro.agregar(HOJA_EFECTY, df_total)
+
+        # Lectura, cruce y escritura se intercalan bloque a bloque: cada parte suma su tiempo en un
+        # Cronometro y se registra como etapa interna
+        with etapa(medicion, "siigo por bloques (factura, NIT, cruce con provisión)") as registro:
+            leer, cruzar, escribir = Cronometro(), Cronometro(), Cronometro()
+            sumas_siigo = SumaPorClave("IDENTIFICACION", "DÉBITO")
+            filas_siigo = filas_siigo_nui = 0
+            bloques = leer_excel_por_bloques(siigo, *ARCHIVOS_RECAUDO["siigo"], filas=filas_bloque)
+            for bloque in _cronometrado(bloques, leer):
+                with cruzar:
+                    bloque = separar_factura_siigo(bloque)
+                    sumas_siigo.agregar(bloque)
+                    cruzado = cruzar_siigo_provision(bloque, df_provision)
+                with escribir:
+                    filas_siigo_nui += libro.agregar(HOJA_SIIGO, cruzado)
+                filas_siigo += len(bloque)
+            registro["FILAS"] = filas_siigo
+            registrar(medicion, "leer siigo (bloques)", leer, filas_siigo)
+            registrar(medicion, "siigo: factura, NIT y cruce con provisión (bloques)", cruzar, filas_siigo_nui)
+            registrar(medicion, "escribir siigo (bloques)", escribir, filas_siigo_nui)
+
+        with etapa(medicion, "diferencias efecty / siigo") as registro:
+            sum_val_movil = df_total.groupby("CC")["VALOR MOVILIZADO"].sum().reset_index()
+            solo_df1, resultado_1, solo_df2, resultado_2 = conciliar_sumas(
+                sum_val_movil, sumas_siigo.resultado(), df_total["VALOR MOVILIZADO"].sum(), sumas_siigo.total
+            )
+            libro.escribir(HOJA_RESUMEN, bloques_resumen(solo_df1, resultado_1, solo_df2, resultado_2))
+            registro["FILAS"] = len(solo_df1) + len(solo_df2)
+
+        with etapa(medicion, "acumulado por bloques") as registro:
+            leer, escribir = Cronometro(), Cronometro()
+            filas_unido = 0
+            if base_acumulado is None:
+                bloques = leer_excel_por_bloques(acumulado, *ARCHIVOS_RECAUDO["acumulado"], filas=filas_bloque)
+                for df in _acumulado_por_bloques(df_para_agregar, _cronometrado(bloques, leer)):
+                    with escribir:
+                        filas_unido += libro.agregar(HOJA_ACUMULADO, df)
+                filas_acumulado = filas_unido - len(df_para_agregar)
+                registrar(medicion, "leer acumulado (bloques)", leer, filas_acumulado)
+            else:
+                # La base local ya lee solo los periodos del lote; el Excel, si hace falta, se importa por bloques
+                base = Cronometro()
+                con = abrir_acumulado(base_acumulado)
+                try:
+                    if acumulado is not None and contar_acumulado(con) == 0:
+                        with leer:
+                            importar_acumulado(con, acumulado, filas_bloque=filas_bloque)
+                        registrar(medicion, "leer acumulado (importar a la base)", leer, contar_acumulado(con))
+                    with base:
+                        df_unido = unir_con_acumulado(con, df_para_agregar)
+                        agregar_al_acumulado(con, df_para_agregar)
+                        filas_acumulado = contar_acumulado(con)
+                    registrar(medicion, "base acumulada", base, len(df_unido))
+                    with escribir:
+                        filas_unido = libro.agregar(HOJA_ACUMULADO, df_unido)
+                finally:
+                    con.close()
+            registro["FILAS"] = filas_unido
+            registrar(medicion, "escribir acumulado (bloques)", escribir, filas_unido)
+
+        with etapa(medicion, "cerrar xlsx"):
+            libro.cerrar()
+
+    return ResultadoPorBloques(
+        df_merged=df_merged,
+        df_total=df_total,
+        solo_df1=solo_df1,
+        resultado_1=resultado_1,
+        solo_df2=solo_df2,
+        resultado_2=resultado_2,
+        df_para_agregar=df_para_agregar,
+        filas_siigo=filas_siigo,
+        filas_siigo_nui=filas_siigo_nui,
+        filas_acumulado=filas_acumulado,
+        filas_unido=filas_unido,
+    )
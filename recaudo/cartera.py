@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .claves import normalizar_clave
+from .exportar import escribir_libro
+from .lectura import COLUMNAS_ORDENES, leer_excel
+
+# Cartera: los archivos de órdenes de cada mes se cargan juntos, cada uno en un proceso del pool,
+# y se unen en una sola tabla con el archivo de origen de cada fila. Una orden que aparece en
+# varios archivos se conserva una sola vez, la del último archivo en el orden en que se entregaron
+# (el de subida en la app, el de los argumentos en la línea de comandos): los nombres ("ordenes_abril",
+# "ordenes_enero") no dicen qué archivo es más reciente. Todas las filas de órdenes repetidas se
+# listan aparte, marcando cuál se conservó.
+COLUMNAS_CARTERA = COLUMNAS_ORDENES
+COLUMNA_ARCHIVO = "ARCHIVO"
+CLAVE_CARTERA = "NUMERO_ORDEN"
+COLUMNA_CONSERVADA = "CONSERVADA"
+COLUMNAS_RESUMEN_CARTERA = ["ARCHIVO", "ESTADO", "FILAS", "ÓRDENES CONSERVADAS", "SEGUNDOS"]
+
+
+@dataclass
+class ResultadoCartera:
+    df_cartera: pd.DataFrame
+    resumen: pd.DataFrame
+    duplicadas: int
+    repetidas: pd.DataFrame
+
+    def hojas_xlsx(self):
+        # Hojas para escribir_libro: la cartera unida, el resumen por archivo y las órdenes repetidas
+        return [
+            ("Cartera", [(self.df_cartera, 0, 0)], None),
+            ("Archivos", [(self.resumen, 0, 0)], None),
+            ("Repetidas", [(self.repetidas, 0, 0)], None),
+        ]
+
+
+def leer_cartera(nombre, fuente, motor=None):
+    # Corre en un proceso del pool: lee un archivo de órdenes (ruta o bytes) y marca su origen
+    inicio = time.perf_counter()
+    if isinstance(fuente, bytes):
+        fuente = BytesIO(fuente)
+    df = leer_excel(fuente, COLUMNAS_CARTERA, motor=motor)
+    df.insert(0, COLUMNA_ARCHIVO, nombre)
+    return df, time.perf_counter() - inicio
+
+
+def leer_carteras(fuentes, workers=None, motor=None, al_terminar=None):
+    # fuentes: {nombre: ruta o bytes}. Devuelve {nombre: (DataFrame, segundos)} o {nombre: excepción}
+    # para los archivos que no se pudieron leer, en el orden de fuentes; con un solo archivo (o worker)
+    # no se abre el pool
+    workers = min(workers or os.cpu_count() or 1, len(fuentes))
+    leidos = {}
+    if workers <= 1:
+        for nombre, fuente in fuentes.items():
+            try:
+                leidos[nombre] = leer_cartera(nombre, fuente, motor)
+            except Exception as error:
+                leidos[nombre] = error
+            if al_terminar is not None:
+                al_terminar(nombre, len(leidos), len(fuentes))
+        return leidos
+
+    # spawn y no fork: la app de Streamlit tiene varios hilos y un proceso hijo creado con fork
+    # puede quedar bloqueado en un candado que otro hilo tenía tomado
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futuros = {pool.submit(leer_cartera, nombre, fuente, motor): nombre for nombre, fuente in fuentes.items()}
+        for futuro in as_completed(futuros):
+            nombre = futuros[futuro]
+            try:
+                leidos[nombre] = futuro.result()
+            except Exception as error:
+                leidos[nombre] = error
+            if al_terminar is not None:
+                al_terminar(nombre, len(leidos), len(fuentes))
+    return {nombre: leidos[nombre] for nombre in fuentes}
+
+
+def unir_carteras(leidos):
+    # Une los archivos en el orden de leidos, deja una fila por NUMERO_ORDEN (la del último archivo),
+    # lista aparte las filas de órdenes repetidas y rellena los vacíos con "NA" como la Cartera original
+    nombres = list(leidos)
+    dataframes = [leidos[nombre][0] for nombre in nombres if not isinstance(leidos[nombre], Exception)]
+    if dataframes:
+        df = pd.concat(dataframes, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=[COLUMNA_ARCHIVO] + COLUMNAS_CARTERA)
+
+    duplicadas = 0
+    repetidas = df.iloc[:0].assign(**{COLUMNA_CONSERVADA: pd.Series(dtype=object)})
+    if CLAVE_CARTERA in df.columns:
+        clave = normalizar_clave(df[CLAVE_CARTERA])
+        en_varias = (clave.notna() & clave.duplicated(keep=False)).to_numpy()
+        descartada = (clave.notna() & clave.duplicated(keep="last")).to_numpy()
+        duplicadas = int(descartada.sum())
+        # Las filas de cada orden repetida juntas, en el orden de los archivos
+        repetidas = df[en_varias].assign(**{COLUMNA_CONSERVADA: np.where(descartada[en_varias], "NO", "SI")})
+        repetidas = repetidas.iloc[clave[en_varias].argsort(kind="stable")].reset_index(drop=True)
+        df = df[~descartada].reset_index(drop=True)
+
+    conservadas = df[COLUMNA_ARCHIVO].value_counts()
+    filas = []
+    for nombre in nombres:
+        leido = leidos[nombre]
+        if isinstance(leido, Exception):
+            filas.append({"ARCHIVO": nombre, "ESTADO": f"ERROR: {leido}"})
+        else:
+            filas.append({"ARCHIVO": nombre, "ESTADO": "OK", "FILAS": len(leido[0]),
+                          "ÓRDENES CONSERVADAS": int(conservadas.get(nombre, 0)), "SEGUNDOS": round(leido[1], 2)})
+    resumen = pd.DataFrame(filas, columns=COLUMNAS_RESUMEN_CARTERA)
+
+    return ResultadoCartera(df_cartera=df.fillna("NA"), resumen=resumen, duplicadas=duplicadas,
+                            repetidas=repetidas.fillna("NA"))
+
+
+def procesar_cartera(fuentes, workers=None, motor=None, al_terminar=None):
+    return unir_carteras(leer_carteras(fuentes, workers=workers, motor=motor, al_terminar=al_terminar))
+
+
+def fuentes_cartera(rutas):
+    # {nombre: ruta} de los .xlsx indicados en el orden dado (define qué archivo prevalece en las
+    # órdenes repetidas); dentro de una carpeta, por nombre
+    fuentes = {}
+    for ruta in map(Path, rutas):
+        archivos = sorted(ruta.rglob("*.xlsx")) if ruta.is_dir() else [ruta]
+        for archivo in archivos:
+            if not archivo.name.startswith("~$"):
+                fuentes[archivo.name if archivo.name not in fuentes else str(archivo)] = archivo
+    return fuentes
+
+
+def fuentes_subidas(archivos):
+    # {nombre: contenido} de una lista de (nombre, contenido), en el mismo orden; si dos archivos se
+    # llaman igual (p. ej. ordenes.xlsx de dos meses), el repetido queda como "ordenes.xlsx (2)"
+    fuentes = {}
+    for nombre, contenido in archivos:
+        clave, repeticion = nombre, 1
+        while clave in fuentes:
+            repeticion += 1
+            clave = f"{nombre} ({repeticion})"
+        fuentes[clave] = contenido
+    return fuentes
+
+
+def generar_xlsx_cartera(resultado, destino=None):
+    return escribir_libro(resultado.hojas_xlsx(), destino)
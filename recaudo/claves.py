@@ -0,0 +1,50 @@
+import pandas as pd
+
+# Claves de identidad de cada archivo del cruce (cédulas, NUI y números de orden)
+CLAVES_RECAUDO = {
+    "liquidacion": ["DOCUMENTO"],
+    "ordenes": ["NUMERO_ORDEN", "IDENTIFICACION"],
+    "provision": ["NUI", "CC"],
+}
+
+
+def normalizar_clave(serie):
+    # Forma canónica de una clave: Int64 si todos los valores son números enteros
+    # (123, 123.0, " 123" y "123" quedan iguales), si no texto sin espacios; vacíos como <NA>
+    if pd.api.types.is_integer_dtype(serie):
+        return serie.astype("Int64")
+
+    texto = serie.astype("string").str.strip().str.replace(r"\.0+$", "", regex=True)
+    texto = texto.mask(texto == "")
+    if texto.dropna().str.fullmatch(r"\d{1,18}").all():
+        return pd.to_numeric(texto).astype("Int64")
+    return texto
+
+
+def normalizar_claves(df, columnas):
+    df = df.copy()
+    for col in columnas:
+        if col in df.columns:
+            df[col] = normalizar_clave(df[col])
+    return df
+
+
+def alinear_claves(izquierda, derecha):
+    # Si un lado no es numérico, ambos se comparan como texto
+    if izquierda.dtype == derecha.dtype:
+        return izquierda, derecha
+    return izquierda.astype("string"), derecha.astype("string")
+
+
+def unir_por_indice(izq, der, clave_izq, clave_der, how="inner"):
+    # Equivalente a izq.merge(der, left_on=clave_izq, right_on=clave_der, how=how), pero contra
+    # un índice de la clave de la derecha; las dos columnas clave se conservan. A diferencia de
+    # merge, una clave vacía (<NA>) no se une con nada: las filas sin clave de la derecha se descartan
+    clave_i, clave_d = alinear_claves(izq[clave_izq], der[clave_der])
+    izq = izq.assign(**{clave_izq: clave_i})
+    con_clave = clave_d.notna().to_numpy()
+    der, clave_d = der[con_clave].assign(**{clave_der: clave_d[con_clave]}), clave_d[con_clave]
+    der.index = pd.Index(clave_d, name=None)
+
+    unido = izq.join(der, on=clave_izq, how=how, lsuffix="_x", rsuffix="_y")
+    return unido.reset_index(drop=True)
@@ -0,0 +1,187 @@
+import argparse
+import os
+import sys
+from contextlib import closing
+
+from .acumulado import abrir_acumulado, contar_acumulado, importar_acumulado, leer_acumulado
+from .bloques import ejecutar_cruce_por_bloques
+from .cartera import fuentes_cartera, generar_xlsx_cartera, procesar_cartera
+from .cruce import ErrorCruce, ejecutar_cruce
+from .exportar import FORMATOS_TABLA, exportar_tabla, generar_xlsx_acumulado
+from .lectura import FILAS_BLOQUE
+from .lote import procesar_lote
+from .medicion import Medicion
+
+
+def _comando_cruzar(args):
+    if args.acumulado is None and args.base_acumulado is None:
+        print("Indique el Excel del Acumulado o una base acumulada con --base-acumulado.", file=sys.stderr)
+        return 1
+
+    medicion = Medicion(memoria=args.memoria_por_etapa) if args.medicion else None
+    if args.por_bloques:
+        return _cruzar_por_bloques(args, medicion)
+
+    resultado = ejecutar_cruce(args.liquidacion, args.ordenes, args.provision, args.siigo, args.acumulado,
+                               args.salida, motor=args.motor, base_acumulado=args.base_acumulado,
+                               medicion=medicion)
+    if args.base_acumulado is None:
+        acumulada = len(resultado.df_acumulado)
+    else:
+        with closing(abrir_acumulado(args.base_acumulado)) as con:
+            acumulada = contar_acumulado(con)
+    print(f"Acumulada: {acumulada}  Agregar: {len(resultado.df_para_agregar)}  "
+          f"Unida: {len(resultado.df_unido)}  ->  {args.salida}")
+
+    if args.exportar_tablas:
+        extension = FORMATOS_TABLA[args.exportar_tablas][0]
+        base = os.path.splitext(args.salida)[0]
+        for nombre, df in resultado.tablas().items():
+            exportar_tabla(df, args.exportar_tablas, f"{base}_{nombre}{extension}")
+        print(f"Tablas exportadas en {args.exportar_tablas}  ->  {base}_*{extension}")
+
+    _guardar_medicion(medicion, args.medicion)
+    return 0
+
+
+def _cruzar_por_bloques(args, medicion):
+    if args.exportar_tablas:
+        print("--exportar-tablas no está disponible con --por-bloques (Siigo y el Acumulado no se "
+              "cargan en memoria).", file=sys.stderr)
+        return 1
+
+    resultado = ejecutar_cruce_por_bloques(args.liquidacion, args.ordenes, args.provision, args.siigo,
+                                           args.acumulado, args.salida, motor=args.motor,
+                                           base_acumulado=args.base_acumulado, filas_bloque=args.filas_bloque,
+                                           medicion=medicion)
+    print(f"Siigo: {resultado.filas_siigo}  Acumulada: {resultado.filas_acumulado}  "
+          f"Agregar: {len(resultado.df_para_agregar)}  Unida: {resultado.filas_unido}  ->  {args.salida}")
+    _guardar_medicion(medicion, args.medicion)
+    return 0
+
+
+def _guardar_medicion(medicion, destino):
+    if medicion is not None:
+        medicion.guardar_json(destino)
+        print(medicion.tabla().to_string(index=False))
+        print(f"Medición por etapa  ->  {destino}")
+
+
+def _comando_acumulado(args):
+    with closing(abrir_acumulado(args.base_acumulado)) as con:
+        if args.accion == "importar":
+            agregados = importar_acumulado(con, args.archivo, motor=args.motor, filas_bloque=args.filas_bloque)
+            print(f"{agregados} registros importados; la base tiene {contar_acumulado(con)}.")
+        else:
+            generar_xlsx_acumulado(leer_acumulado(con), args.archivo)
+            print(f"{contar_acumulado(con)} registros exportados  ->  {args.archivo}")
+    return 0
+
+
+def _comando_lote(args):
+    def informar(fila, hechos, total):
+        if fila["ESTADO"] == "OK":
+            print(f"[{hechos}/{total}] {fila['JUEGO']}: {fila['REGISTROS CRUZADOS']} registros en "
+                  f"{fila['SEGUNDOS']} s ({fila['FILAS/SEG']} filas/s)")
+        else:
+            print(f"[{hechos}/{total}] {fila['JUEGO']}: {fila['ESTADO']}")
+
+    resumen = procesar_lote(args.origen, args.salida, workers=args.workers, motor=args.motor, al_terminar=informar,
+                            medir=args.medicion)
+    if resumen.empty:
+        print("No se encontraron juegos completos de archivos en el origen.", file=sys.stderr)
+        return 1
+    print(f"{len(resumen)} juegos procesados  ->  {args.salida}")
+    return 0
+
+
+def _comando_cartera(args):
+    fuentes = fuentes_cartera(args.archivos)
+    if not fuentes:
+        print("No se encontraron archivos .xlsx de órdenes.", file=sys.stderr)
+        return 1
+
+    resultado = procesar_cartera(fuentes, workers=args.workers, motor=args.motor,
+                                 al_terminar=lambda nombre, hechos, total: print(f"[{hechos}/{total}] {nombre}"))
+    generar_xlsx_cartera(resultado, args.salida)
+    for fila in resultado.resumen.itertuples(index=False):
+        if fila.ESTADO != "OK":
+            print(f"{fila.ARCHIVO}: {fila.ESTADO}", file=sys.stderr)
+    print(f"{len(resultado.df_cartera)} órdenes de {len(fuentes)} archivos ({resultado.duplicadas} repetidas "
+          f"descartadas, ver hoja Repetidas)  ->  {args.salida}")
+    return 0
+
+
+def construir_parser():
+    parser = argparse.ArgumentParser(prog="recaudo", description="Cruce de recaudo Efecty / Siigo / Provisión.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    cruzar = subparsers.add_parser("cruzar", help="Cruza un juego de archivos y genera datos_cruzados.xlsx")
+    cruzar.add_argument("liquidacion", help="Excel de Liquidación")
+    cruzar.add_argument("ordenes", help="Excel de Órdenes")
+    cruzar.add_argument("provision", help="Excel de Provisión")
+    cruzar.add_argument("siigo", help="Excel de Siigo")
+    cruzar.add_argument("acumulado", nargs="?", default=None,
+                        help="Excel del Acumulado (opcional con --base-acumulado; si la base está vacía se importa)")
+    cruzar.add_argument("-o", "--salida", default="datos_cruzados.xlsx", help="Ruta del Excel de salida")
+    cruzar.add_argument("--base-acumulado", default=None,
+                        help="Base SQLite del Acumulado: el lote se agrega a ella sin reescribir el histórico")
+    cruzar.add_argument("--motor", choices=["calamine", "openpyxl"], default=None,
+                        help="Motor de lectura de Excel (por defecto calamine si está instalado)")
+    cruzar.add_argument("--exportar-tablas", choices=list(FORMATOS_TABLA), default=None,
+                        help="Además del Excel, escribe cada tabla de resultado en este formato")
+    cruzar.add_argument("--medicion", metavar="JSON", default=None,
+                        help="Guarda tiempo y filas de cada etapa del cruce en este JSON")
+    cruzar.add_argument("--memoria-por-etapa", action="store_true",
+                        help="Con --medicion, agrega el pico de memoria de cada etapa (tracemalloc; varias veces "
+                             "más lento, los tiempos no son comparables con corridas sin esta opción)")
+    cruzar.add_argument("--por-bloques", action="store_true",
+                        help="Lee Siigo y el Acumulado por bloques de filas y escribe el Excel a medida que "
+                             "avanza (para archivos que no caben en memoria; más lento)")
+    cruzar.add_argument("--filas-bloque", type=int, default=FILAS_BLOQUE,
+                        help=f"Filas por bloque con --por-bloques (por defecto {FILAS_BLOQUE})")
+    cruzar.set_defaults(funcion=_comando_cruzar)
+
+    lote = subparsers.add_parser("lote", help="Cruza en paralelo todos los juegos de archivos de una carpeta o .zip")
+    lote.add_argument("origen", help="Carpeta o .zip con una subcarpeta por juego (Liquidación, Órdenes, "
+                                     "Provisión, Siigo y Acumulado)")
+    lote.add_argument("-o", "--salida", default="resultados_lote", help="Carpeta de salida")
+    lote.add_argument("-w", "--workers", type=int, default=None,
+                      help="Procesos en paralelo (por defecto, uno por núcleo)")
+    lote.add_argument("--medicion", action="store_true",
+                      help="Guarda la medición por etapa de cada juego en medicion_<juego>.json")
+    lote.add_argument("--motor", choices=["calamine", "openpyxl"], default=None,
+                      help="Motor de lectura de Excel (por defecto calamine si está instalado)")
+    lote.set_defaults(funcion=_comando_lote)
+
+    acumulado = subparsers.add_parser("acumulado", help="Importa o exporta la base acumulada local")
+    acumulado.add_argument("accion", choices=["importar", "exportar"])
+    acumulado.add_argument("archivo", help="Excel del Acumulado a importar, o Excel de salida al exportar")
+    acumulado.add_argument("--base-acumulado", default="acumulado.sqlite", help="Ruta de la base SQLite")
+    acumulado.add_argument("--motor", choices=["calamine", "openpyxl"], default=None,
+                           help="Motor de lectura de Excel (por defecto calamine si está instalado)")
+    acumulado.add_argument("--filas-bloque", type=int, default=None,
+                           help="Al importar, lee e inserta el Excel por bloques de este número de filas")
+    acumulado.set_defaults(funcion=_comando_acumulado)
+
+    cartera = subparsers.add_parser("cartera", help="Une los archivos de órdenes de Cartera en un solo Excel")
+    cartera.add_argument("archivos", nargs="+",
+                         help="Archivos .xlsx de órdenes o carpetas que los contienen, del más antiguo al más "
+                              "reciente: una orden repetida se toma del último archivo")
+    cartera.add_argument("-o", "--salida", default="facturacion_procesada.xlsx", help="Ruta del Excel de salida")
+    cartera.add_argument("-w", "--workers", type=int, default=None,
+                         help="Procesos en paralelo (por defecto, uno por núcleo)")
+    cartera.add_argument("--motor", choices=["calamine", "openpyxl"], default=None,
+                         help="Motor de lectura de Excel (por defecto calamine si está instalado)")
+    cartera.set_defaults(funcion=_comando_cartera)
+
+    return parser
+
+
+def main(argv=None):
+    args = construir_parser().parse_args(argv)
+    try:
+        return args.funcion(args) or 0
+    except ErrorCruce as error:
+        print(f"⚠️ {error}", file=sys.stderr)
+        return 1
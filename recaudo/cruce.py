@@ -0,0 +1,301 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import unidecode  # type: ignore
+
+from .acumulado import (abrir_acumulado, agregar_al_acumulado, contar_acumulado, importar_acumulado,
+                        unir_con_acumulado)
+from .claves import CLAVES_RECAUDO, alinear_claves, normalizar_clave, normalizar_claves, unir_por_indice
+from .exportar import generar_xlsx
+from .lectura import cargar_recaudo
+from .medicion import etapa
+
+
+class ErrorCruce(ValueError):
+    # Error de validación de los archivos cargados; el mensaje se muestra tal cual al usuario
+    pass
+
+
+# Meses en español (en mayúsculas) por número de mes, sin depender del locale del sistema
+MESES_ES = {
+    1: 'ENERO',
+    2: 'FEBRERO',
+    3: 'MARZO',
+    4: 'ABRIL',
+    5: 'MAYO',
+    6: 'JUNIO',
+    7: 'JULIO',
+    8: 'AGOSTO',
+    9: 'SEPTIEMBRE',
+    10: 'OCTUBRE',
+    11: 'NOVIEMBRE',
+    12: 'DICIEMBRE'
+}
+
+COLUMNAS_PARA_AGREGAR = ["FECHA", "MES", "AÑO", "CÓDIGO PUNTO DE SERVICIO", "NUMERO_ORDEN", "VALOR MOVILIZADO",
+                         "VALOR COMISIÓN", "IVA", "TOTAL LIQUIDACIÓN", "NUI", "CC", "NOMBRE_COMPLETO", "FACTURA",
+                         "PROYECTO"]
+
+
+@dataclass
+class ResultadoRecaudo:
+    df_merged: pd.DataFrame
+    df_total: pd.DataFrame
+    df_siigo: pd.DataFrame
+    df_siigo_nui: pd.DataFrame
+    solo_df1: pd.DataFrame
+    resultado_1: pd.DataFrame
+    solo_df2: pd.DataFrame
+    resultado_2: pd.DataFrame
+    df_para_agregar: pd.DataFrame
+    df_acumulado: pd.DataFrame
+    df_unido: pd.DataFrame
+
+    def tablas(self):
+        # Tablas de resultado por nombre, para exportarlas una a una (Parquet/CSV)
+        return {
+            "Datos_Cruzados_Efecty": self.df_total,
+            "Datos_Cruzados_Siigo": self.df_siigo_nui,
+            "Diferencias_Efecty_Siigo": self.solo_df1,
+            "No_en_Siigo": self.resultado_1,
+            "Diferencias_Siigo_Efecty": self.solo_df2,
+            "No_en_Efecty": self.resultado_2,
+            "Recaudo_Acumulado": self.df_unido,
+        }
+
+    def hojas_xlsx(self):
+        # Argumentos de generar_xlsx en su orden posicional
+        return (self.df_total, self.solo_df1, self.resultado_1, self.solo_df2, self.resultado_2,
+                self.df_unido, self.df_siigo_nui)
+
+
+def normalizar_nombres(serie):
+    # Transliteración con unidecode una sola vez por valor distinto (los nombres se repiten mucho)
+    # y mapeo de vuelta por código; vacíos quedan en '' y celdas no texto se convierten a str
+    texto = serie.fillna('').astype(str)
+    codigos, unicos = pd.factorize(texto)
+    transliterados = np.array([unidecode.unidecode(valor) for valor in unicos], dtype=object)
+    return pd.Series(transliterados[codigos], index=serie.index, dtype=object)
+
+
+def agregar_nombre_completo(df_ordenes):
+    df_ordenes = df_ordenes.copy()
+    if all(col in df_ordenes.columns for col in ["NOMBRES", "APELLIDO1", "APELLIDO2"]):
+        df_ordenes["NOMBRE_COMPLETO"] = (
+            normalizar_nombres(df_ordenes["NOMBRES"]) + " " +
+            normalizar_nombres(df_ordenes["APELLIDO1"]) + " " +
+            normalizar_nombres(df_ordenes["APELLIDO2"])
+        ).str.strip()
+    return df_ordenes
+
+
+def separar_factura_siigo(df_siigo):
+    # Se separa numero de factura y cedula de la DESCRIPCIÓN ("FV-1-12345 1020304050")
+    df_siigo = df_siigo.copy()
+    df_siigo['DESCRIPCIÓN'] = df_siigo['DESCRIPCIÓN'].str.replace(r'-\s+', '-', regex=True)
+    df_siigo[['FACTURA', 'IDENTIFICACION']] = df_siigo['DESCRIPCIÓN'].str.extract(r'^FV-\d+-(\d+)\s+(\d+)')
+    df_siigo['IDENTIFICACION'] = normalizar_clave(df_siigo['IDENTIFICACION'])
+    return df_siigo
+
+
+def cruzar_siigo_provision(df_siigo, df_provision):
+    # Cruce entre Siigo y Usuarios para traer NUI
+    return unir_por_indice(df_siigo, df_provision[['CC', 'NUI']], "IDENTIFICACION", "CC").drop(columns=["CC"])
+
+
+def cruzar_efecty(df_liqui, df_ordenes, df_provision):
+    # Liquidación ↔ Órdenes por número de orden, y luego Órdenes ↔ Provisión por NUI
+    if len(df_liqui) != len(df_ordenes):
+        raise ErrorCruce("Las bases de datos cargadas no tienen la misma cantidad de registros. "
+                         "Por favor, validar antes de cargar.")
+
+    df_merged = unir_por_indice(df_liqui, df_ordenes, "DOCUMENTO", "NUMERO_ORDEN")
+    df_merged = df_merged.drop(columns=["NOMBRES", "APELLIDO1", "APELLIDO2"]).reset_index(drop=True)
+
+    if "IDENTIFICACION" not in df_merged.columns or "NUI" not in df_provision.columns:
+        raise ErrorCruce("No se encontraron las columnas 'IDENTIFICACION' o 'NUI' para realizar el segundo cruce.")
+
+    df_total = unir_por_indice(df_merged, df_provision, "IDENTIFICACION", "NUI")
+    df_total["FACTURA"] = limpiar_factura(df_total["FACTURA"])
+    df_total = agregar_anio_mes(df_total)
+    return df_merged, df_total
+
+
+def limpiar_factura(factura):
+    # Insertar un espacio entre 'FE' y un número si está pegado y luego eliminar 'FE' (seguido o no de espacio)
+    factura = factura.astype(str).str.replace(r"\bFE(?=\d)", "FE ", regex=True)
+    return factura.str.replace(r"\bFE\s*", "", regex=True)
+
+
+def agregar_anio_mes(df):
+    # Convertir FECHA a datetime y separar AÑO y MES (en español)
+    df['FECHA'] = pd.to_datetime(df['FECHA'], errors='coerce')
+    df['AÑO'] = df['FECHA'].dt.year
+    df['MES'] = df['FECHA'].dt.month.map(MESES_ES)
+    return df
+
+
+def sumar_por_cedula(df_total, df_siigo):
+    # Valor movilizado (Efecty) y débito (Siigo) por cédula, sin filas de total
+    sum_val_movil = df_total.groupby("CC")["VALOR MOVILIZADO"].sum().reset_index()
+    sum_siigo = df_siigo.groupby('IDENTIFICACION')["DÉBITO"].sum().reset_index()
+    return sum_val_movil, sum_siigo
+
+
+def _agregar_total(df, fila_total):
+    # Fila "TOTAL GENERAL" al final de una tabla de diferencias
+    return pd.concat([df, pd.DataFrame([fila_total], columns=df.columns)], ignore_index=True)
+
+
+def diferencias_efecty_siigo(df_total, df_siigo):
+    sum_val_movil, sum_siigo = sumar_por_cedula(df_total, df_siigo)
+    return conciliar_sumas(sum_val_movil, sum_siigo, df_total["VALOR MOVILIZADO"].sum(), df_siigo["DÉBITO"].sum())
+
+
+def conciliar_sumas(sum_val_movil, sum_siigo, sum_total_val_movil, sum_total_siigo):
+    # Conciliación en una sola pasada: un outer join con indicador separa las cédulas en ambos lados,
+    # solo en Efecty y solo en Siigo; las dos vistas (Efecty vs Siigo y Siigo vs Efecty) salen de él.
+    # Recibe las sumas por cédula (CC / IDENTIFICACION) y los totales generales de cada lado.
+    cc, identificacion = alinear_claves(sum_val_movil["CC"], sum_siigo["IDENTIFICACION"])
+    cruce = sum_val_movil.assign(CC=cc).merge(
+        sum_siigo.assign(IDENTIFICACION=identificacion),
+        left_on='CC',
+        right_on='IDENTIFICACION',
+        how='outer',
+        sort=True,
+        indicator=True
+    )
+
+    # Diferencias Efecty vs Siigo: cédulas de Efecty, con o sin registro en Siigo
+    efecty = cruce[cruce["_merge"] != "right_only"].reset_index(drop=True)
+    resultado_1 = efecty.loc[efecty["_merge"] == "left_only", ['CC', 'VALOR MOVILIZADO']]
+    solo_df1 = efecty[['CC', 'VALOR MOVILIZADO', 'IDENTIFICACION', 'DÉBITO']].copy()
+    solo_df1["DIFERENCIA_EFECTY_SIIGO"] = solo_df1["VALOR MOVILIZADO"] - solo_df1["DÉBITO"]
+    solo_df1 = _agregar_total(solo_df1, ["TOTAL GENERAL", sum_total_val_movil, "TOTAL GENERAL", sum_total_siigo,
+                                         sum_total_val_movil - sum_total_siigo])
+
+    # Diferencias Siigo vs Efecty: cédulas de Siigo, con o sin registro en Efecty
+    siigo = cruce[cruce["_merge"] != "left_only"].reset_index(drop=True)
+    resultado_2 = siigo.loc[siigo["_merge"] == "right_only", ['IDENTIFICACION', 'DÉBITO']]
+    solo_df2 = siigo[['IDENTIFICACION', 'DÉBITO', 'CC', 'VALOR MOVILIZADO']].copy()
+    solo_df2["DIFERENCIA_SIIGO_EFECTY"] = solo_df2["DÉBITO"] - solo_df2["VALOR MOVILIZADO"]
+    solo_df2 = _agregar_total(solo_df2, ["TOTAL GENERAL", sum_total_siigo, "TOTAL GENERAL", sum_total_val_movil,
+                                         sum_total_siigo - sum_total_val_movil])
+    return solo_df1, resultado_1, solo_df2, resultado_2
+
+
+def base_para_agregar(df_total):
+    # Base con la forma del Acumulado a partir del cruce Efecty
+    df_para_agregar = df_total[COLUMNAS_PARA_AGREGAR].copy()
+
+    # Columnas con valor fijo en la posición que tienen en el Acumulado
+    df_para_agregar.insert(0, "MEDIO DE PAGO", "EFECTY")
+    df_para_agregar.insert(1, "MEDIO DE RECAUDO", "")
+    df_para_agregar.insert(16, "VALIDADO", "")
+    df_para_agregar.insert(17, "COMPROBANTE CONTABLE", "")
+
+    # Renombrar columnas para que coincidan con las de df_acumulado
+    return df_para_agregar.rename(columns={
+        "NUMERO_ORDEN": "ORDEN DE SERVICIO",
+        "CC": "CEDULA",
+        "NOMBRE_COMPLETO": "NOMBRE",
+        "PROYECTO": "MUNICIPIO"
+    })
+
+
+def unir_acumulado(df_para_agregar, df_acumulado):
+    if df_acumulado is None:
+        return df_para_agregar, df_para_agregar.iloc[0:0], df_para_agregar.reset_index(drop=True)
+
+    # Asegurar que ambos DataFrames tengan el mismo número de columnas
+    min_cols = min(df_acumulado.shape[1], df_para_agregar.shape[1])
+    df_acumulado = df_acumulado.iloc[:, :min_cols]
+    df_para_agregar = df_para_agregar.iloc[:, :min_cols]
+
+    df_unido = pd.concat([df_para_agregar, df_acumulado], axis=0, ignore_index=True)
+    return df_para_agregar, df_acumulado, df_unido
+
+
+def preparar_entradas(df_liqui, df_ordenes, df_provision, medicion=None):
+    # Claves normalizadas en los tres archivos del lado Efecty y NOMBRE_COMPLETO en Órdenes
+    with etapa(medicion, "normalizar claves"):
+        df_liqui = normalizar_claves(df_liqui, CLAVES_RECAUDO["liquidacion"])
+        df_ordenes = normalizar_claves(df_ordenes, CLAVES_RECAUDO["ordenes"])
+        df_provision = normalizar_claves(df_provision, CLAVES_RECAUDO["provision"])
+
+    with etapa(medicion, "nombres (unidecode)") as registro:
+        df_ordenes = agregar_nombre_completo(df_ordenes)
+        registro["FILAS"] = len(df_ordenes)
+    return df_liqui, df_ordenes, df_provision
+
+
+def procesar_recaudo(df_liqui, df_ordenes, df_provision, df_siigo, df_acumulado=None, medicion=None):
+    # Cruce completo Efecty/Siigo/Provisión; no modifica los DataFrames recibidos.
+    # Sin df_acumulado (base acumulada local), df_unido contiene solo los registros del lote.
+    # Las claves de los cruces se normalizan una sola vez, antes de cualquier unión.
+    # Con medicion (recaudo.medicion.Medicion) se registra tiempo, filas y memoria de cada etapa.
+    df_liqui, df_ordenes, df_provision = preparar_entradas(df_liqui, df_ordenes, df_provision, medicion)
+
+    with etapa(medicion, "siigo: extraer factura y NIT") as registro:
+        df_siigo = separar_factura_siigo(df_siigo)
+        registro["FILAS"] = len(df_siigo)
+    with etapa(medicion, "cruce siigo / provisión") as registro:
+        df_siigo_nui = cruzar_siigo_provision(df_siigo, df_provision)
+        registro["FILAS"] = len(df_siigo_nui)
+
+    with etapa(medicion, "cruce efecty (liquidación, órdenes, provisión)") as registro:
+        df_merged, df_total = cruzar_efecty(df_liqui, df_ordenes, df_provision)
+        registro["FILAS"] = len(df_total)
+
+    with etapa(medicion, "diferencias efecty / siigo") as registro:
+        solo_df1, resultado_1, solo_df2, resultado_2 = diferencias_efecty_siigo(df_total, df_siigo)
+        registro["FILAS"] = len(solo_df1) + len(solo_df2)
+
+    with etapa(medicion, "unir acumulado") as registro:
+        df_para_agregar, df_acumulado, df_unido = unir_acumulado(base_para_agregar(df_total), df_acumulado)
+        registro["FILAS"] = len(df_unido)
+
+    return ResultadoRecaudo(
+        df_merged=df_merged,
+        df_total=df_total,
+        df_siigo=df_siigo,
+        df_siigo_nui=df_siigo_nui,
+        solo_df1=solo_df1,
+        resultado_1=resultado_1,
+        solo_df2=solo_df2,
+        resultado_2=resultado_2,
+        df_para_agregar=df_para_agregar,
+        df_acumulado=df_acumulado,
+        df_unido=df_unido,
+    )
+
+
+def ejecutar_cruce(liquidacion, ordenes, provision, siigo, acumulado, salida, motor=None, base_acumulado=None,
+                   medicion=None):
+    # Cruce completo desde rutas de archivo hasta el Excel de salida; devuelve el resultado.
+    # Con base_acumulado (ruta SQLite) el lote se registra en la base local en lugar de
+    # concatenarse con el Excel del Acumulado, que entonces es opcional.
+    if base_acumulado is None:
+        dataframes = cargar_recaudo(liquidacion, ordenes, provision, siigo, acumulado, motor=motor,
+                                    medicion=medicion)
+        resultado = procesar_recaudo(*dataframes, medicion=medicion)
+    else:
+        dataframes = cargar_recaudo(liquidacion, ordenes, provision, siigo, None, motor=motor, medicion=medicion)
+        resultado = procesar_recaudo(*dataframes[:4], medicion=medicion)
+
+        with etapa(medicion, "base acumulada") as registro:
+            con = abrir_acumulado(base_acumulado)
+            try:
+                if acumulado is not None and contar_acumulado(con) == 0:
+                    importar_acumulado(con, acumulado, motor=motor)
+                resultado.df_unido = unir_con_acumulado(con, resultado.df_para_agregar)
+                agregar_al_acumulado(con, resultado.df_para_agregar)
+            finally:
+                con.close()
+            registro["FILAS"] = len(resultado.df_unido)
+
+    with etapa(medicion, "exportar xlsx") as registro:
+        generar_xlsx(*resultado.hojas_xlsx(), destino=salida)
+        registro["FILAS"] = sum(len(df) for df in resultado.hojas_xlsx())
+    return resultado
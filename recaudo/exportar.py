@@ -0,0 +1,260 @@
+import gzip
+import heapq
+import io
+import os
+import tempfile
+from io import BytesIO
+
+import pandas as pd
+import xlsxwriter
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:
+    pa = pq = None
+
+
+# Filas totales a partir de las cuales el libro se escribe en modo constant_memory de xlsxwriter:
+# cada fila se vuelca a disco al escribirse y el resultado queda en un archivo temporal, así la
+# memoria no crece con el tamaño del Acumulado. Por debajo, todo se arma en memoria (más rápido).
+UMBRAL_FILAS_STREAMING = 50_000
+
+# Filas que se convierten a valores de celda a la vez
+TAMANO_BLOQUE = 10_000
+
+
+def _filas(df, fila_inicio, col_inicio, encabezado=True):
+    # (fila, columna, valores) en orden de fila, empezando por el encabezado; NaN/NaT pasan a None por bloques
+    if encabezado:
+        yield fila_inicio, col_inicio, list(df.columns)
+        fila_inicio += 1
+    for inicio in range(0, len(df), TAMANO_BLOQUE):
+        bloque = df.iloc[inicio:inicio + TAMANO_BLOQUE].astype(object)
+        bloque = bloque.where(bloque.notna(), None)
+        for fila, valores in enumerate(bloque.itertuples(index=False, name=None), start=fila_inicio + inicio):
+            yield fila, col_inicio, valores
+
+
+def _abrir_libro(salida, streaming, carpeta_temporal=None):
+    libro = xlsxwriter.Workbook(salida, {
+        "constant_memory": streaming,
+        "in_memory": not streaming,
+        "tmpdir": carpeta_temporal,
+        "default_date_format": "YYYY-MM-DD HH:MM:SS",
+    })
+    formato_pesos = libro.add_format({'num_format': '$#,##0', 'align': 'right'})
+    return libro, formato_pesos
+
+
+def _dar_formato(hoja, bloques, es_pesos, formato_pesos):
+    # Ancho 18 en las columnas usadas y formato de pesos donde corresponda
+    if es_pesos is None:
+        primera = min(col for _, _, col in bloques)
+        ultima = max(col + len(df.columns) - 1 for df, _, col in bloques)
+        hoja.set_column(primera, ultima, 18)
+    else:
+        for df, _, col_inicio in bloques:
+            for i, col in enumerate(df.columns, start=col_inicio):
+                hoja.set_column(i, i, 18, formato_pesos if es_pesos(col) else None)
+
+
+def _escribir_filas(hoja, filas):
+    for fila, col_inicio, valores in filas:
+        for col, valor in enumerate(valores, start=col_inicio):
+            if valor is not None:
+                hoja.write(fila, col, valor)
+
+
+def escribir_libro(hojas, destino=None):
+    # hojas: lista de (nombre, bloques, es_pesos) donde bloques es una lista de (df, fila, columna)
+    # y es_pesos(nombre_columna) indica las columnas con formato de pesos (None: sin formato).
+    # destino puede ser una ruta o un archivo abierto; sin destino se devuelve el archivo generado.
+    filas_totales = sum(len(df) for _, bloques, _ in hojas for df, _, _ in bloques)
+    streaming = filas_totales >= UMBRAL_FILAS_STREAMING
+    if destino is None:
+        salida = tempfile.TemporaryFile() if streaming else BytesIO()
+    else:
+        salida = destino
+
+    libro, formato_pesos = _abrir_libro(salida, streaming)
+    for nombre, bloques, es_pesos in hojas:
+        hoja = libro.add_worksheet(nombre)
+        _dar_formato(hoja, bloques, es_pesos, formato_pesos)
+
+        # Las filas de todos los bloques se escriben en orden, como exige constant_memory
+        _escribir_filas(hoja, heapq.merge(*(_filas(df, fila, col) for df, fila, col in bloques),
+                                          key=lambda item: item[0]))
+
+    libro.close()
+    if destino is None:
+        salida.seek(0)
+    return salida
+
+
+class LibroPorBloques:
+    # Libro xlsx (constant_memory) que se escribe a medida que llegan los datos: cada hoja recibe
+    # DataFrames sucesivos que se agregan debajo de lo ya escrito, así una tabla que no cabe en
+    # memoria se vuelca bloque a bloque. Las hojas pueden llenarse en cualquier orden (xlsxwriter
+    # guarda un archivo temporal por hoja); dentro de una hoja las filas solo avanzan.
+    # Si destino es una ruta, el libro se escribe en un archivo parcial junto a ella y solo pasa a
+    # destino al cerrarse sin errores: un cruce que falla a medias no deja un Excel truncado.
+    # Los temporales por hoja van en una carpeta propia que se borra al cerrar (xlsxwriter no
+    # borra el de una hoja que quedó sin filas).
+    def __init__(self, destino, hojas):
+        # hojas: lista de (nombre, es_pesos) en el orden en que aparecen en el libro
+        self.destino = destino if isinstance(destino, (str, os.PathLike)) else None
+        if self.destino is not None:
+            destino = self.parcial = f"{os.fspath(self.destino)}.{os.getpid()}.parcial"
+        self.temporales = tempfile.TemporaryDirectory()
+        self.libro, self.formato_pesos = _abrir_libro(destino, streaming=True,
+                                                      carpeta_temporal=self.temporales.name)
+        self.hojas = {nombre: self.libro.add_worksheet(nombre) for nombre, _ in hojas}
+        self.es_pesos = dict(hojas)
+        self.siguiente = dict.fromkeys(self.hojas)
+        self.cerrado = False
+
+    def agregar(self, nombre, df):
+        # Agrega las filas de df a la hoja (con encabezado y formato la primera vez); devuelve las filas escritas
+        hoja = self.hojas[nombre]
+        encabezado = self.siguiente[nombre] is None
+        if encabezado:
+            _dar_formato(hoja, [(df, 0, 0)], self.es_pesos[nombre], self.formato_pesos)
+            self.siguiente[nombre] = 0
+        _escribir_filas(hoja, _filas(df, self.siguiente[nombre], 0, encabezado))
+        self.siguiente[nombre] += len(df) + encabezado
+        return len(df)
+
+    def escribir(self, nombre, bloques):
+        # Hoja completa con varios bloques (df, fila, columna), como en escribir_libro
+        hoja = self.hojas[nombre]
+        _dar_formato(hoja, bloques, self.es_pesos[nombre], self.formato_pesos)
+        _escribir_filas(hoja, heapq.merge(*(_filas(df, fila, col) for df, fila, col in bloques),
+                                          key=lambda item: item[0]))
+
+    def cerrar(self):
+        if not self.cerrado:
+            self.cerrado = True
+            try:
+                self.libro.close()
+            except BaseException:
+                self._borrar_parcial()
+                raise
+            finally:
+                self.temporales.cleanup()
+            if self.destino is not None:
+                os.replace(self.parcial, self.destino)
+
+    def descartar(self):
+        # Abandona el libro sin escribir destino: se cierra igual (así xlsxwriter borra sus
+        # temporales por hoja) y se borra el archivo parcial
+        if not self.cerrado:
+            self.cerrado = True
+            try:
+                self.libro.close()
+            finally:
+                self._borrar_parcial()
+                self.temporales.cleanup()
+
+    def _borrar_parcial(self):
+        if self.destino is not None and os.path.exists(self.parcial):
+            os.remove(self.parcial)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, *exc):
+        if tipo is None:
+            self.cerrar()
+        else:
+            self.descartar()
+        return False
+
+
+# Hojas de datos_cruzados.xlsx con la función que marca sus columnas en pesos
+COLUMNAS_PESOS_EFECTY = ["VALOR MOVILIZADO", "VALOR COMISIÓN", "IVA", "TOTAL LIQUIDACIÓN"]
+HOJAS_RECAUDO = [
+    ("Datos_Cruzados Efecty", lambda col: col in COLUMNAS_PESOS_EFECTY),
+    ("Datos_Cruzados Siigo", lambda col: col == "DÉBITO"),
+    ("Resumen_Recaudo", None),
+    ("Recaudo_Acumulado", lambda col: "VALOR" in col or "DÉBITO" in col),
+]
+
+
+def bloques_resumen(solo_df1, resultado_1, solo_df2, resultado_2):
+    # Posición de las cuatro tablas de diferencias en la hoja Resumen_Recaudo
+    return [(solo_df1, 1, 1), (resultado_1, 1, 7), (solo_df2, 1, 10), (resultado_2, 1, 16)]
+
+
+def generar_xlsx(df1, df2, df3, df4, df5, df6, df7, destino=None):
+    contenido = [[(df1, 0, 0)], [(df7, 0, 0)], bloques_resumen(df2, df3, df4, df5), [(df6, 0, 0)]]
+    hojas = [(nombre, bloques, es_pesos) for (nombre, es_pesos), bloques in zip(HOJAS_RECAUDO, contenido)]
+    return escribir_libro(hojas, destino)
+
+
+def generar_xlsx_acumulado(df, destino=None):
+    # Solo la hoja Recaudo_Acumulado, p. ej. para descargar la base acumulada completa
+    nombre, es_pesos = HOJAS_RECAUDO[-1]
+    return escribir_libro([(nombre, [(df, 0, 0)], es_pesos)], destino)
+
+
+def generar_csv(df, destino=None, comprimir=False, tamano_bloque=TAMANO_BLOQUE):
+    # CSV escrito por bloques de filas (opcionalmente gzip) directamente en destino o en un
+    # archivo temporal, sin armar el texto completo en memoria
+    salida = tempfile.TemporaryFile() if destino is None else destino
+    binario = open(salida, "wb") if isinstance(salida, (str, os.PathLike)) else salida
+    comprimido = gzip.GzipFile(fileobj=binario, mode="wb") if comprimir else None
+    texto = io.TextIOWrapper(comprimido or binario, encoding="utf-8", newline="")
+    try:
+        for inicio in range(0, max(len(df), 1), tamano_bloque):
+            df.iloc[inicio:inicio + tamano_bloque].to_csv(texto, index=False, header=inicio == 0)
+        texto.flush()
+    finally:
+        texto.detach()
+        if comprimido is not None:
+            comprimido.close()
+        if binario is not salida:
+            binario.close()
+
+    if destino is None:
+        salida.seek(0)
+    return salida
+
+
+def _tabla_arrow(df):
+    # Parquet exige un tipo por columna: las columnas object con valores mezclados
+    # (p. ej. cédulas numéricas y de texto del Acumulado) se escriben como texto
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def generar_parquet(df, destino=None, filas_por_grupo=100_000):
+    # Parquet (pyarrow) escrito por grupos de filas en destino o en un archivo temporal
+    if pa is None:
+        raise ImportError("La exportación a Parquet requiere pyarrow (pip install pyarrow).")
+
+    salida = tempfile.TemporaryFile() if destino is None else destino
+    tabla = _tabla_arrow(df)
+    with pq.ParquetWriter(salida, tabla.schema) as escritor:
+        for inicio in range(0, max(tabla.num_rows, 1), filas_por_grupo):
+            escritor.write_table(tabla.slice(inicio, filas_por_grupo))
+
+    if destino is None:
+        salida.seek(0)
+    return salida
+
+
+# Formatos de exportación por tabla: extensión, tipo MIME y función generadora
+FORMATOS_TABLA = {
+    "parquet": (".parquet", "application/vnd.apache.parquet", generar_parquet),
+    "csv": (".csv", "text/csv", generar_csv),
+    "csv.gz": (".csv.gz", "application/gzip", lambda df, destino=None: generar_csv(df, destino, comprimir=True)),
+}
+
+
+def exportar_tabla(df, formato, destino=None):
+    _, _, generar = FORMATOS_TABLA[formato]
+    return generar(df, destino)
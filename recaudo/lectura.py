@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import islice
+
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from .medicion import etapa
+
+# Motor de lectura de Excel: calamine (python-calamine) es varias veces más rápido
+# que openpyxl; si no está instalado se usa openpyxl en modo read_only.
+try:
+    from python_calamine import CalamineWorkbook  # type: ignore
+    MOTOR_EXCEL = "calamine"
+except ImportError:
+    CalamineWorkbook = None
+    MOTOR_EXCEL = "openpyxl"
+
+# ------------------- COLUMNAS REQUERIDAS POR ARCHIVO -------------------
+COLUMNAS_LIQUI = ["DOCUMENTO", "CÓDIGO PROYECTO", "FECHA", "FORMA DE PAGO",
+                  "CÓDIGO PUNTO DE SERVICIO", "VALOR MOVILIZADO", "VALOR COMISIÓN",
+                  "IVA", "TOTAL LIQUIDACIÓN", "ANO"]
+COLUMNAS_ORDENES = ["NUMERO_ORDEN", "IDENTIFICACION", "NOMBRES", "APELLIDO1", "APELLIDO2", "FACTURA"]
+COLUMNAS_PROVISION = ["NUI", "CC", "PROYECTO"]
+COLUMNAS_SIIGO = ["CÓDIGO CONTABLE", "CUENTA CONTABLE", "COMPROBANTE", "SECUENCIA", "FECHA ELABORACIÓN",
+                  "NOMBRE DEL TERCERO", "DESCRIPCIÓN", "CENTRO DE COSTO", "DÉBITO"]
+COLUMNAS_ACUMULADO = ["MEDIO DE PAGO", "MEDIO DE RECAUDO", "FECHA", "MES", "AÑO", "CÓDIGO PUNTO DE SERVICIO",
+                      "ORDEN DE SERVICIO", "VALOR MOVILIZADO", "VALOR COMISIÓN", "IVA", "TOTAL LIQUIDACIÓN",
+                      "NUI", "CEDULA", "NOMBRE", "FACTURA", "MUNICIPIO", "VALIDADO", "COMPROBANTE CONTABLE"]
+
+# Tipos explícitos por columna para no depender de la inferencia del motor de lectura
+TIPOS_VALORES = {"VALOR MOVILIZADO": "float64", "VALOR COMISIÓN": "float64",
+                 "IVA": "float64", "TOTAL LIQUIDACIÓN": "float64"}
+TIPOS_LIQUI = TIPOS_VALORES
+TIPOS_ORDENES = {}
+TIPOS_PROVISION = {}
+TIPOS_SIIGO = {"DÉBITO": "float64"}
+TIPOS_ACUMULADO = TIPOS_VALORES
+
+# Columnas y tipos de cada archivo del cruce, en el orden en que se reciben
+ARCHIVOS_RECAUDO = {
+    "liquidacion": (COLUMNAS_LIQUI, TIPOS_LIQUI),
+    "ordenes": (COLUMNAS_ORDENES, TIPOS_ORDENES),
+    "provision": (COLUMNAS_PROVISION, TIPOS_PROVISION),
+    "siigo": (COLUMNAS_SIIGO, TIPOS_SIIGO),
+    "acumulado": (COLUMNAS_ACUMULADO, TIPOS_ACUMULADO),
+}
+
+
+# Filas por bloque al leer por bloques (lectura fuera de memoria de Siigo y del Acumulado)
+FILAS_BLOQUE = 50_000
+
+
+def _normalizar_encabezado(nombre):
+    return str(nombre).strip().upper()
+
+
+def _aplicar_tipos(df, tipos):
+    # Tipos explícitos: los numéricos se convierten con coerce para tolerar celdas vacías o texto
+    for col, tipo in (tipos or {}).items():
+        if col not in df.columns:
+            continue
+        if pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(tipo)):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(tipo)
+        else:
+            df[col] = df[col].astype(tipo)
+    return df
+
+
+def _valor_celda(valor):
+    # Misma conversión que los lectores de Excel de pandas: celda vacía como "", números enteros
+    # guardados como float vuelven a int y las fechas sin hora pasan a datetime
+    if valor is None:
+        return ""
+    if isinstance(valor, float):
+        return int(valor) if valor.is_integer() else valor
+    if isinstance(valor, date) and not isinstance(valor, datetime):
+        return datetime(valor.year, valor.month, valor.day)
+    return valor
+
+
+def _proyectar(filas, indices):
+    # Solo las celdas de `indices` de cada fila, convertidas con _valor_celda. Como read_excel,
+    # descarta las filas vacías del final de la hoja (las intermedias se conservan); "vacía" se
+    # mira en la fila completa, sin convertir sus celdas
+    pendientes = []
+    for fila in filas:
+        proyectada = tuple(_valor_celda(fila[i]) if i < len(fila) else "" for i in indices)
+        if all(valor is None or valor == "" for valor in fila):
+            pendientes.append(proyectada)
+            continue
+        yield from pendientes
+        pendientes.clear()
+        yield proyectada
+
+
+@contextmanager
+def _hoja_excel(fuente, columnas, motor):
+    # Recorre la primera hoja fila a fila y entrega (columnas presentes, filas con solo esas columnas):
+    # el resto de columnas nunca llega a pandas. calamine guarda la hoja en su formato compacto
+    # (en Rust); openpyxl en modo read_only no la carga y sirve para leer por bloques.
+    if motor == "calamine":
+        libro = CalamineWorkbook.from_object(fuente)
+        filas = libro.get_sheet_by_index(0).iter_rows()
+    else:
+        libro = openpyxl.load_workbook(fuente, read_only=True, data_only=True)
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+    try:
+        encabezado = [_normalizar_encabezado(nombre) for nombre in next(filas, ())]
+
+        # Posición de la primera aparición de cada columna pedida, en el orden de `columnas`
+        posiciones = {}
+        for i, nombre in enumerate(encabezado):
+            posiciones.setdefault(nombre, i)
+        presentes = [col for col in columnas if col in posiciones]
+        indices = [posiciones[col] for col in presentes]
+
+        yield presentes, _proyectar(filas, indices)
+    finally:
+        libro.close()
+
+
+def _a_dataframe(filas, presentes, tipos):
+    # TextParser es el mismo que usa read_excel: infiere los tipos (p. ej. números guardados como texto)
+    df = TextParser(filas, names=presentes, header=None, skip_blank_lines=False).read()
+    return _aplicar_tipos(df, tipos)
+
+
+def leer_excel(fuente, columnas, tipos=None, motor=None):
+    # Mismo resultado que read_excel con el encabezado normalizado (strip/upper) y filtrado a
+    # `columnas`, pero solo se materializan las columnas pedidas: el encabezado se lee primero y
+    # de cada fila se toman únicamente sus posiciones
+    with _hoja_excel(fuente, columnas, motor or MOTOR_EXCEL) as (presentes, filas):
+        return _a_dataframe(list(filas), presentes, tipos)
+
+
+def leer_excel_por_bloques(fuente, columnas, tipos=None, filas=FILAS_BLOQUE):
+    # Igual que leer_excel, pero devuelve DataFrames sucesivos de hasta `filas` filas: openpyxl en
+    # modo read_only recorre la hoja sin cargarla, así la memoria depende del bloque y no del archivo
+    with _hoja_excel(fuente, columnas, "openpyxl") as (presentes, filas_hoja):
+        while True:
+            bloque = list(islice(filas_hoja, filas))
+            if not bloque:
+                break
+            yield _a_dataframe(bloque, presentes, tipos)
+
+
+def cargar_recaudo(liquidacion, ordenes, provision, siigo, acumulado, motor=None, medicion=None):
+    # Lee los cinco archivos del cruce (rutas o archivos abiertos) y devuelve sus DataFrames
+    # (un archivo en None se devuelve como None, p. ej. el Acumulado cuando se usa la base local)
+    fuentes = [liquidacion, ordenes, provision, siigo, acumulado]
+    dataframes = []
+    for fuente, (rol, (columnas, tipos)) in zip(fuentes, ARCHIVOS_RECAUDO.items()):
+        if fuente is None:
+            dataframes.append(None)
+            continue
+        with etapa(medicion, f"leer {rol}") as registro:
+            df = leer_excel(fuente, columnas, tipos, motor)
+            registro["FILAS"] = len(df)
+        dataframes.append(df)
+    return tuple(dataframes)
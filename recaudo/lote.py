@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+import unidecode  # type: ignore
+
+from .cruce import ejecutar_cruce
+from .lectura import ARCHIVOS_RECAUDO
+from .medicion import Medicion
+
+# Palabra clave en el nombre del archivo que identifica el rol de cada Excel dentro de un juego
+CLAVES_ARCHIVO = {
+    "liquidacion": "liquidacion",
+    "ordenes": "orden",
+    "provision": "provision",
+    "siigo": "siigo",
+    "acumulado": "acumulado",
+}
+
+
+def _rol_archivo(ruta):
+    nombre = unidecode.unidecode(ruta.stem).lower()
+    for rol, clave in CLAVES_ARCHIVO.items():
+        if clave in nombre:
+            return rol
+    return None
+
+
+def _extraer_zip(origen, destino):
+    # Los .zip creados sin la marca UTF-8 (Windows, zip de Info-ZIP) guardan los nombres
+    # con tildes en cp437; se recuperan para reconocer "Liquidación", "Órdenes", etc.
+    with zipfile.ZipFile(origen) as comprimido:
+        for info in comprimido.infolist():
+            if not info.flag_bits & 0x800:
+                try:
+                    info.filename = info.filename.encode("cp437").decode("utf-8")
+                except UnicodeError:
+                    pass
+            comprimido.extract(info, destino)
+
+
+def descubrir_juegos(raiz, nombre_raiz=None):
+    # Un juego es una carpeta (o la raíz) que contiene los cinco Excel del cruce;
+    # devuelve {nombre_juego: {rol: ruta}} ordenado por nombre. El juego de la raíz se llama
+    # nombre_raiz (p. ej. el del .zip, cuya raíz es una carpeta temporal) o como la carpeta
+    raiz = Path(raiz)
+    carpetas = {}
+    for ruta in sorted(raiz.rglob("*.xlsx")):
+        if ruta.name.startswith("~$"):
+            continue
+        rol = _rol_archivo(ruta)
+        if rol is not None:
+            carpetas.setdefault(ruta.parent, {}).setdefault(rol, ruta)
+
+    juegos = {}
+    for carpeta, rutas in carpetas.items():
+        if set(rutas) != set(ARCHIVOS_RECAUDO):
+            continue
+        relativa = carpeta.relative_to(raiz)
+        nombre = "_".join(relativa.parts) if relativa.parts else nombre_raiz or raiz.name
+        juegos[nombre] = rutas
+    return dict(sorted(juegos.items()))
+
+
+def procesar_juego(nombre, rutas, destino, motor=None, medir=False):
+    # Corre en un proceso del pool: cruza un juego y devuelve solo su resumen (no los DataFrames).
+    # Con medir, las etapas del juego se guardan en medicion_<juego>.json junto a su Excel.
+    inicio = time.perf_counter()
+    salida = Path(destino) / f"datos_cruzados_{nombre}.xlsx"
+    medicion = Medicion() if medir else None
+    resultado = ejecutar_cruce(*(rutas[rol] for rol in ARCHIVOS_RECAUDO), salida, motor=motor, medicion=medicion)
+    segundos = time.perf_counter() - inicio
+    if medicion is not None:
+        medicion.guardar_json(Path(destino) / f"medicion_{nombre}.json")
+
+    filas = len(resultado.df_total)
+    total_efecty = resultado.df_total["VALOR MOVILIZADO"].sum()
+    total_siigo = resultado.df_siigo["DÉBITO"].sum()
+    return {
+        "JUEGO": nombre,
+        "ESTADO": "OK",
+        "REGISTROS CRUZADOS": filas,
+        "NO EN SIIGO": len(resultado.resultado_1),
+        "NO EN EFECTY": len(resultado.resultado_2),
+        "VALOR MOVILIZADO": total_efecty,
+        "DÉBITO": total_siigo,
+        "DIFERENCIA": total_efecty - total_siigo,
+        "SEGUNDOS": round(segundos, 2),
+        "FILAS/SEG": round(filas / segundos, 1) if segundos else None,
+        "ARCHIVO": salida.name,
+    }
+
+
+def procesar_lote(origen, destino, workers=None, motor=None, al_terminar=None, medir=False):
+    # Cruza todos los juegos de una carpeta o .zip en un pool de procesos (uno por núcleo por defecto),
+    # escribe un Excel por juego más resumen_lote.xlsx en destino y devuelve el resumen
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        raiz = Path(origen)
+        if zipfile.is_zipfile(origen):
+            _extraer_zip(origen, temporal)
+            raiz = Path(temporal)
+
+        juegos = descubrir_juegos(raiz, nombre_raiz=Path(origen).stem)
+        filas = []
+        # spawn y no fork: la app de Streamlit tiene varios hilos y un proceso hijo creado con fork
+        # puede quedar bloqueado en un candado que otro hilo tenía tomado
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futuros = {
+                pool.submit(procesar_juego, nombre, rutas, destino, motor, medir): nombre
+                for nombre, rutas in juegos.items()
+            }
+            for futuro in as_completed(futuros):
+                try:
+                    fila = futuro.result()
+                except Exception as error:
+                    fila = {"JUEGO": futuros[futuro], "ESTADO": f"ERROR: {error}"}
+                filas.append(fila)
+                if al_terminar is not None:
+                    al_terminar(fila, len(filas), len(juegos))
+
+    resumen = pd.DataFrame(filas, columns=["JUEGO", "ESTADO", "REGISTROS CRUZADOS", "NO EN SIIGO", "NO EN EFECTY",
+                                           "VALOR MOVILIZADO", "DÉBITO", "DIFERENCIA", "SEGUNDOS", "FILAS/SEG",
+                                           "ARCHIVO"])
+    resumen = resumen.sort_values("JUEGO", ignore_index=True)
+    resumen.to_excel(destino / "resumen_lote.xlsx", index=False)
+    return resumen
@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+COLUMNAS_MEDICION = ["ETAPA", "NIVEL", "SEGUNDOS", "FILAS", "MEMORIA PICO MB"]
+
+# tracemalloc es uno solo por proceso (un pico, un start/stop): solo una Medicion a la vez lo usa,
+# y nunca uno que ya estaba activo por otra causa, para no reiniciar ni detener una traza ajena
+_candado_traza = threading.Lock()
+_duena_traza = None
+
+
+def _tomar_traza(medicion):
+    global _duena_traza
+    with _candado_traza:
+        if _duena_traza is None and not tracemalloc.is_tracing():
+            _duena_traza = medicion
+            tracemalloc.start()
+        return _duena_traza is medicion
+
+
+def _soltar_traza(medicion):
+    global _duena_traza
+    with _candado_traza:
+        if _duena_traza is medicion:
+            tracemalloc.stop()
+            _duena_traza = None
+
+
+class Medicion:
+    # Registro de etapas del cruce: tiempo de reloj, filas producidas y, con memoria=True, pico de
+    # memoria (tracemalloc, que también contabiliza los arreglos de numpy/pandas). tracemalloc hace
+    # el código varias veces más lento, así que los tiempos con memoria no son comparables con los
+    # sin ella. Si otra Medicion del proceso ya está trazando (p. ej. otra sesión de la app), la
+    # memoria de esta queda vacía. Las etapas pueden anidarse: el pico de una etapa incluye el de
+    # las etapas internas.
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self.etapas = []
+        self._abiertas = []
+        self._trazando = False
+
+    def _acumular_pico(self):
+        # Lleva el pico actual a todas las etapas abiertas antes de reiniciarlo
+        pico = tracemalloc.get_traced_memory()[1]
+        for abierta in self._abiertas:
+            abierta["_pico"] = max(abierta["_pico"], pico)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def etapa(self, nombre):
+        # Uso: with medicion.etapa("leer siigo") as registro: ...; registro["FILAS"] = len(df)
+        # La traza se toma al abrir la primera etapa y se suelta al cerrar la última
+        externa = not self._abiertas
+        if externa:
+            self._trazando = self.memoria and _tomar_traza(self)
+        registro = {"ETAPA": nombre, "NIVEL": len(self._abiertas), "SEGUNDOS": None, "FILAS": None,
+                    "MEMORIA PICO MB": None}
+        self.etapas.append(registro)
+        if self._trazando:
+            self._acumular_pico()
+            base = tracemalloc.get_traced_memory()[0]
+        registro["_pico"] = 0
+        self._abiertas.append(registro)
+
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro["SEGUNDOS"] = round(time.perf_counter() - inicio, 4)
+            if self._trazando:
+                self._acumular_pico()
+                registro["MEMORIA PICO MB"] = round(max(registro["_pico"] - base, 0) / 2**20, 2)
+            self._abiertas.remove(registro)
+            del registro["_pico"]
+            if externa and self._trazando:
+                _soltar_traza(self)
+                self._trazando = False
+
+    def agregar(self, nombre, segundos, filas=None):
+        # Etapa cuyo tiempo se midió por partes con un Cronometro; queda dentro de la etapa abierta
+        self.etapas.append({"ETAPA": nombre, "NIVEL": len(self._abiertas), "SEGUNDOS": round(segundos, 4),
+                            "FILAS": filas, "MEMORIA PICO MB": None})
+
+    def tabla(self):
+        return pd.DataFrame(self.etapas, columns=COLUMNAS_MEDICION).astype({"FILAS": "Int64"})
+
+    def a_dict(self):
+        return {
+            "generado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "segundos_totales": round(sum(e["SEGUNDOS"] for e in self.etapas if e["NIVEL"] == 0), 4),
+            "etapas": [{clave: e[clave] for clave in COLUMNAS_MEDICION} for e in self.etapas],
+        }
+
+    def a_json(self):
+        return json.dumps(self.a_dict(), ensure_ascii=False, indent=2)
+
+    def guardar_json(self, destino):
+        with open(destino, "w", encoding="utf-8") as archivo:
+            archivo.write(self.a_json())
+
+
+class Cronometro:
+    # Tiempo sumado de una parte del trabajo que se repite intercalada con otras (p. ej. leer, cruzar
+    # y escribir cada bloque): cada "with cronometro:" suma su duración
+    def __init__(self):
+        self.segundos = 0.0
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.segundos += time.perf_counter() - self._inicio
+
+
+def registrar(medicion, nombre, cronometro, filas=None):
+    # Como etapa(), para el tiempo de un Cronometro; sin Medicion no se registra nada
+    if medicion is not None:
+        medicion.agregar(nombre, cronometro.segundos, filas)
+
+
+def etapa(medicion, nombre):
+    # Etapa medida si hay Medicion; si no, un contexto vacío (el registro devuelto se descarta)
+    return nullcontext({}) if medicion is None else medicion.etapa(nombre)
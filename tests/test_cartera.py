@@ -0,0 +1,63 @@
+import pandas as pd
+
+from recaudo.cartera import COLUMNA_ARCHIVO, fuentes_subidas, procesar_cartera, unir_carteras
+
+
+def _leido(nombre, ordenes, facturas):
+    df = pd.DataFrame({"NUMERO_ORDEN": ordenes, "FACTURA": facturas})
+    df.insert(0, COLUMNA_ARCHIVO, nombre)
+    return df, 0.1
+
+
+def test_prevalece_el_ultimo_archivo_entregado_no_el_ultimo_por_nombre():
+    # "ordenes_abril" va después de "ordenes_enero": por nombre quedaría antes
+    leidos = {
+        "ordenes_enero.xlsx": _leido("ordenes_enero.xlsx", [1, 2], ["FE1", "FE2"]),
+        "ordenes_abril.xlsx": _leido("ordenes_abril.xlsx", [2, 3], ["FE2-ABRIL", "FE3"]),
+    }
+    resultado = unir_carteras(leidos)
+    cartera = resultado.df_cartera.set_index("NUMERO_ORDEN")
+    assert cartera.loc[2, "FACTURA"] == "FE2-ABRIL"
+    assert resultado.duplicadas == 1
+    assert resultado.resumen["ARCHIVO"].tolist() == ["ordenes_enero.xlsx", "ordenes_abril.xlsx"]
+
+
+def test_lista_las_ordenes_repetidas():
+    leidos = {
+        "a.xlsx": _leido("a.xlsx", ["10", "20", "30"], ["FE10", "FE20", "FE30"]),
+        "b.xlsx": _leido("b.xlsx", ["20", "40"], ["FE20-B", "FE40"]),
+        "c.xlsx": _leido("c.xlsx", ["20.0"], ["FE20-C"]),
+    }
+    resultado = unir_carteras(leidos)
+    repetidas = resultado.repetidas
+    assert repetidas[COLUMNA_ARCHIVO].tolist() == ["a.xlsx", "b.xlsx", "c.xlsx"]
+    assert repetidas["CONSERVADA"].tolist() == ["NO", "NO", "SI"]
+    assert resultado.duplicadas == 2
+    assert len(resultado.df_cartera) == 4
+
+
+def test_sin_repetidas():
+    resultado = unir_carteras({"a.xlsx": _leido("a.xlsx", [1, 2], ["FE1", "FE2"])})
+    assert resultado.duplicadas == 0
+    assert resultado.repetidas.empty
+    assert "CONSERVADA" in resultado.repetidas.columns
+
+
+def test_archivos_subidos_con_el_mismo_nombre_no_se_pierden():
+    fuentes = fuentes_subidas([("ordenes.xlsx", b"enero"), ("otro.xlsx", b"x"), ("ordenes.xlsx", b"febrero"),
+                               ("ordenes.xlsx", b"marzo")])
+    assert list(fuentes) == ["ordenes.xlsx", "otro.xlsx", "ordenes.xlsx (2)", "ordenes.xlsx (3)"]
+    assert fuentes["ordenes.xlsx (2)"] == b"febrero"
+
+
+def test_cartera_con_dos_subidas_del_mismo_nombre(tmp_path):
+    contenidos = []
+    for ordenes in ([1, 2], [2, 3]):
+        ruta = tmp_path / "ordenes.xlsx"
+        df = pd.DataFrame({"NUMERO_ORDEN": ordenes, "FACTURA": [f"FE{orden}" for orden in ordenes]})
+        df.to_excel(ruta, index=False)
+        contenidos.append(("ordenes.xlsx", ruta.read_bytes()))
+    resultado = procesar_cartera(fuentes_subidas(contenidos), workers=1)
+    assert resultado.resumen["ARCHIVO"].tolist() == ["ordenes.xlsx", "ordenes.xlsx (2)"]
+    assert sorted(resultado.df_cartera["NUMERO_ORDEN"].tolist()) == [1, 2, 3]
+    assert resultado.df_cartera.set_index("NUMERO_ORDEN").loc[2, COLUMNA_ARCHIVO] == "ordenes.xlsx (2)"
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from recaudo.claves import normalizar_clave, unir_por_indice
+from recaudo.cruce import cruzar_siigo_provision
+
+
+def test_claves_vacias_no_se_unen():
+    izq = pd.DataFrame({"IDENTIFICACION": normalizar_clave(pd.Series(["10", None, "20"])), "FILA": [1, 2, 3]})
+    der = pd.DataFrame({"CC": normalizar_clave(pd.Series([None, "10", ""])), "NUI": [7, 8, 9]})
+    unido = unir_por_indice(izq, der, "IDENTIFICACION", "CC")
+    assert unido["FILA"].tolist() == [1]
+    assert unido["NUI"].tolist() == [8]
+
+
+def test_claves_vacias_en_union_izquierda():
+    izq = pd.DataFrame({"IDENTIFICACION": normalizar_clave(pd.Series(["10", None])), "FILA": [1, 2]})
+    der = pd.DataFrame({"CC": normalizar_clave(pd.Series([None, "10"])), "NUI": [7, 8]})
+    unido = unir_por_indice(izq, der, "IDENTIFICACION", "CC", how="left")
+    assert unido["FILA"].tolist() == [1, 2]
+    assert unido["NUI"].iloc[0] == 8
+    assert pd.isna(unido["NUI"].iloc[1])
+
+
+def test_siigo_sin_factura_no_toma_nui_de_provision_sin_cc():
+    siigo = pd.DataFrame({"DESCRIPCIÓN": ["FV-1-100 10", "AJUSTE SALDO"],
+                          "IDENTIFICACION": normalizar_clave(pd.Series(["10", None]))})
+    provision = pd.DataFrame({"CC": normalizar_clave(pd.Series(["10", None])), "NUI": [500, 600]})
+    cruzado = cruzar_siigo_provision(siigo, provision)
+    assert cruzado["DESCRIPCIÓN"].tolist() == ["FV-1-100 10"]
+    assert cruzado["NUI"].tolist() == [500]
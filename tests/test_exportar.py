@@ -0,0 +1,39 @@
+import os
+
+import pandas as pd
+import pytest
+
+from recaudo.exportar import LibroPorBloques
+
+HOJAS = [("Datos", None), ("Otra", None)]
+
+
+def test_libro_completo_llega_a_destino(tmp_path):
+    destino = tmp_path / "salida.xlsx"
+    with LibroPorBloques(destino, HOJAS) as libro:
+        libro.agregar("Datos", pd.DataFrame({"A": [1, 2]}))
+        libro.agregar("Datos", pd.DataFrame({"A": [3]}))
+        libro.agregar("Otra", pd.DataFrame({"B": ["x"]}))
+    assert pd.read_excel(destino, sheet_name="Datos")["A"].tolist() == [1, 2, 3]
+    assert [ruta.name for ruta in tmp_path.iterdir()] == ["salida.xlsx"]
+
+
+def test_error_a_medias_no_deja_excel(tmp_path):
+    destino = tmp_path / "salida.xlsx"
+    with pytest.raises(KeyError):
+        with LibroPorBloques(destino, HOJAS) as libro:
+            libro.agregar("Datos", pd.DataFrame({"A": [1, 2]}))
+            raise KeyError("DESCRIPCIÓN")
+    assert list(tmp_path.iterdir()) == []
+    assert not os.path.exists(libro.temporales.name)
+
+
+def test_error_conserva_el_excel_anterior(tmp_path):
+    destino = tmp_path / "salida.xlsx"
+    destino.write_bytes(b"anterior")
+    with pytest.raises(ValueError):
+        with LibroPorBloques(destino, HOJAS) as libro:
+            libro.agregar("Datos", pd.DataFrame({"A": [1]}))
+            raise ValueError
+    assert destino.read_bytes() == b"anterior"
+    assert [ruta.name for ruta in tmp_path.iterdir()] == ["salida.xlsx"]
@@ -0,0 +1,26 @@
+from recaudo.lote import descubrir_juegos
+
+ARCHIVOS = ["Liquidación.xlsx", "Órdenes.xlsx", "Provisión.xlsx", "Siigo.xlsx", "Acumulado.xlsx"]
+
+
+def _juego(carpeta):
+    carpeta.mkdir(parents=True, exist_ok=True)
+    for nombre in ARCHIVOS:
+        (carpeta / nombre).touch()
+
+
+def test_juegos_por_carpeta(tmp_path):
+    _juego(tmp_path / "2025" / "enero")
+    _juego(tmp_path / "febrero")
+    (tmp_path / "incompleto").mkdir()
+    (tmp_path / "incompleto" / "Siigo.xlsx").touch()
+    juegos = descubrir_juegos(tmp_path)
+    assert list(juegos) == ["2025_enero", "febrero"]
+    assert set(juegos["febrero"]) == {"liquidacion", "ordenes", "provision", "siigo", "acumulado"}
+
+
+def test_juego_en_la_raiz_toma_el_nombre_indicado(tmp_path):
+    # Un .zip con los cinco archivos en la raíz se extrae a una carpeta temporal
+    _juego(tmp_path)
+    assert list(descubrir_juegos(tmp_path, nombre_raiz="lote_enero")) == ["lote_enero"]
+    assert list(descubrir_juegos(tmp_path)) == [tmp_path.name]
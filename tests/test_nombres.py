@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+import unidecode
+
+from recaudo.cruce import agregar_nombre_completo, normalizar_nombres
+
+NOMBRES = ["JOSÉ", "MARÍA", "ÁNGELA", "NÚÑEZ", "PEÑA", "Müller", "Ñandú", "", "  ", None, np.nan, "JOSÉ", "MARÍA"]
+
+
+# Camino anterior: fillna('') y unidecode fila por fila
+def nombres_con_apply(serie):
+    return serie.fillna('').apply(lambda x: unidecode.unidecode(x))
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_igual_al_apply_con_tildes_vacios_y_nan(dtype):
+    serie = pd.Series(NOMBRES, dtype=dtype)
+    resultado = normalizar_nombres(serie)
+    esperado = nombres_con_apply(serie)
+    assert resultado.tolist() == esperado.tolist()
+    assert resultado.index.equals(serie.index)
+
+
+def test_conserva_el_indice():
+    serie = pd.Series(["ÁNGELA", np.nan, "PEÑA"], index=[10, 3, 7])
+    resultado = normalizar_nombres(serie)
+    assert resultado.index.tolist() == [10, 3, 7]
+    assert resultado.tolist() == ["ANGELA", "", "PENA"]
+
+
+def test_valores_no_texto_se_convierten_a_str():
+    # El apply fallaba con celdas no texto; ahora se transliteran como str(valor)
+    serie = pd.Series(["JOSÉ", 123, 4.5, pd.Timestamp("2025-01-02"), np.nan], dtype=object)
+    with pytest.raises(Exception):
+        nombres_con_apply(serie)
+    esperado = [unidecode.unidecode(str(valor)) for valor in ["JOSÉ", 123, 4.5, pd.Timestamp("2025-01-02")]] + [""]
+    assert normalizar_nombres(serie).tolist() == esperado
+
+
+def test_serie_vacia():
+    assert normalizar_nombres(pd.Series([], dtype=object)).tolist() == []
+
+
+def test_nombre_completo():
+    df = pd.DataFrame({
+        "NOMBRES": ["JOSÉ", np.nan, "ÁNGELA"],
+        "APELLIDO1": ["NÚÑEZ", "PEÑA", ""],
+        "APELLIDO2": [np.nan, "GÓMEZ", "DÍAZ"],
+    })
+    assert agregar_nombre_completo(df)["NOMBRE_COMPLETO"].tolist() == ["JOSE NUNEZ", "PENA GOMEZ", "ANGELA  DIAZ"]